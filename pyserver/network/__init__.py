@@ -1,8 +1,23 @@
 from .server_conf import *
 from .async_controller import *
+from .async_dispatcher import *
 from .preamble import *
+from .frame_codec import *
+from .frame_compressor import *
+from .frame_decoder import *
+from .frame_writer import *
+from .datagram_reader import *
+from .datagram_writer import *
+from .datagram_fragmenter import *
+from .resolver_cache import *
+from .pmtu_cache import *
+from .reliable_datagram import *
 from .callback_interface import *
+from .callback_dispatcher import *
+from .rpc_channel import *
 from .async_udp import *
 from .async_multicast import *
+from .async_frame_dispatcher import *
 from .async_tcp_server import *
 from .async_tcp_client import *
+from .async_tcp_client_pool import *
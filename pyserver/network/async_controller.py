@@ -35,10 +35,14 @@ THE SOFTWARE.
 
 AsyncController Class.
 """
-import asyncore
+import os
+import selectors
+import socket
 import threading
 
 from pyserver.util.singleton import Singleton
+from pyserver.util.timing_wheel import TimingWheel
+from pyserver.util.buffer_pool import BufferPool
 # noinspection PyDeprecation
 try:
     set
@@ -49,15 +53,51 @@ import traceback
 import copy
 
 
-@Singleton
-class AsyncController(threading.Thread):
-    def __init__(self):
-        threading.Thread.__init__(self)
+'''
+Interfaces
+variables
+- index
+- module_set
+functions
+- def add(module)
+- def discard(module)
+- def update(module) # re-evaluate the module's read/write interest
+- def clear()
+- def stop()
+- def get_load() # number of modules on this reactor
+- def wakeup() # interrupt a blocking select from another thread
+- def is_reactor_thread()
+- def call_later(delay, callback, *args) # run callback on the reactor thread, returns TimerHandle
+- def call_every(interval, callback, *args) # run callback periodically, returns TimerHandle
+'''
+
+
+class AsyncReactor(threading.Thread):
+    def __init__(self, index=0):
+        threading.Thread.__init__(self, name='AsyncReactor-%d' % index)
+        self.index = index
         self.should_stop_event = threading.Event()
         self.has_module_event = threading.Event()
         self.lock = threading.RLock()
         self.module_set = set([])
-        self.timeout = 0.01
+        # epoll/kqueue where available, so idle sockets cost nothing and FD_SETSIZE doesn't apply
+        self.selector = selectors.DefaultSelector()
+        self.interest_map = {}  # module -> (fd, registered events)
+        self.timing_wheel = TimingWheel()
+        # no polling timeout: other threads interrupt select through the wakeup channel
+        self.timeout = None
+        self.wakeup_pending = False
+        self.wakeup_fd = None
+        self.wakeup_pair = None
+        if hasattr(os, 'eventfd'):
+            self.wakeup_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+            self.selector.register(self.wakeup_fd, selectors.EVENT_READ, None)
+        else:
+            # self-pipe fallback
+            self.wakeup_pair = socket.socketpair()
+            for sock in self.wakeup_pair:
+                sock.setblocking(False)
+            self.selector.register(self.wakeup_pair[0], selectors.EVENT_READ, None)
 
         # Self start the thread
         self.start()
@@ -65,15 +105,70 @@ class AsyncController(threading.Thread):
     def run(self):
         while not self.should_stop_event.is_set():
             try:
-                asyncore.loop(timeout=self.timeout)
-                # asyncore.loop()
+                self.poll(self.timeout)
             except Exception as e:
                 print(e)
                 traceback.print_exc()
             self.has_module_event.wait()
         self.has_module_event.clear()
+        self.selector.close()
+        self._close_wakeup()
         print('async Thread exiting...')
 
+    def poll(self, timeout):
+        timer_timeout = self.timing_wheel.next_timeout()
+        if timer_timeout is not None and (timeout is None or timer_timeout < timeout):
+            timeout = timer_timeout
+        for key, mask in self.selector.select(timeout):
+            module = key.data
+            if module is None:
+                self._drain_wakeup()
+                continue
+            try:
+                if mask & selectors.EVENT_READ:
+                    module.handle_read_event()
+                if mask & selectors.EVENT_WRITE and module in self.interest_map:
+                    module.handle_write_event()
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+                module.handle_error()
+            self.update(module)
+        for handle in self.timing_wheel.advance():
+            if handle.cancelled:
+                continue
+            try:
+                handle.run()
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+
+    def update(self, module):
+        # only ask for write interest while the module has something to write
+        with self.lock:
+            if module not in self.module_set or module.socket is None:
+                return
+            events = 0
+            if module.readable():
+                events |= selectors.EVENT_READ
+            if module.connecting or module.writable():
+                events |= selectors.EVENT_WRITE
+            fd, registered = self.interest_map.get(module, (None, 0))
+            if events == registered:
+                return
+            if registered == 0:
+                fd = module.socket.fileno()
+                self.selector.register(fd, events, module)
+            elif events == 0:
+                self.selector.unregister(fd)
+            else:
+                self.selector.modify(fd, events, module)
+            if events == 0:
+                del self.interest_map[module]
+            else:
+                self.interest_map[module] = (fd, events)
+        self.wakeup()
+
     def stop(self):
         with self.lock:
             delete_set = copy.copy(self.module_set)
@@ -86,11 +181,15 @@ class AsyncController(threading.Thread):
             self.module_set = set([])
         self.should_stop_event.set()
         self.has_module_event.set()
+        self.wakeup()
 
     def add(self, module):
         with self.lock:
+            module.reactor = self
             self.module_set.add(module)
+            self.update(module)
         self.has_module_event.set()
+        self.wakeup()
 
     def clear(self):
         with self.lock:
@@ -102,14 +201,162 @@ class AsyncController(threading.Thread):
                     print(e)
                     traceback.print_exc()
             self.module_set = set([])
-        if not self.should_stop_event.is_set():
+        if len(self.timing_wheel) == 0 and not self.should_stop_event.is_set():
             self.has_module_event.clear()
 
     def discard(self, module):
-        print('asyncController discard called')
         with self.lock:
             self.module_set.discard(module)
-            if len(self.module_set) == 0 and not self.should_stop_event.is_set():
+            if module in self.interest_map:
+                fd, registered = self.interest_map.pop(module)
+                try:
+                    self.selector.unregister(fd)
+                except (KeyError, ValueError):
+                    pass
+            # keep polling while timers are pending so call_later still fires with no modules
+            if len(self.module_set) == 0 and len(self.timing_wheel) == 0 and not self.should_stop_event.is_set():
                 self.has_module_event.clear()
 
+    def get_load(self):
+        return len(self.module_set)
+
+    def call_later(self, delay, callback, *args):
+        handle = self.timing_wheel.schedule(delay, callback, args)
+        self.has_module_event.set()
+        self.wakeup()
+        return handle
+
+    def call_every(self, interval, callback, *args):
+        handle = self.timing_wheel.schedule(interval, callback, args, interval)
+        self.has_module_event.set()
+        self.wakeup()
+        return handle
+
+    def is_reactor_thread(self):
+        return threading.current_thread() is self
+
+    def wakeup(self):
+        # the loop thread re-evaluates its selector anyway, and one pending wakeup is enough
+        if self.wakeup_pending or threading.current_thread() is self:
+            return
+        self.wakeup_pending = True
+        try:
+            if self.wakeup_fd is not None:
+                os.eventfd_write(self.wakeup_fd, 1)
+            else:
+                self.wakeup_pair[1].send(b'\0')
+        except (OSError, socket.error):
+            pass
+
+    def _drain_wakeup(self):
+        # drain before clearing the flag: a wakeup written in between would otherwise be consumed
+        # here while the flag stays set, and every later wakeup() would be skipped
+        try:
+            if self.wakeup_fd is not None:
+                os.eventfd_read(self.wakeup_fd)
+            else:
+                while self.wakeup_pair[0].recv(4096):
+                    pass
+        except (OSError, socket.error):
+            pass
+        self.wakeup_pending = False
+
+    def _close_wakeup(self):
+        # keep later wakeup() calls from writing to a closed (or reused) fd
+        self.wakeup_pending = True
+        if self.wakeup_fd is not None:
+            os.close(self.wakeup_fd)
+        else:
+            for sock in self.wakeup_pair:
+                sock.close()
+
+
+'''
+Interfaces
+functions
+- def add(module, reactor=None) # reactor=None places the module on the least-loaded reactor
+- def discard(module)
+- def update(module)
+- def clear()
+- def stop()
+- def join(timeout=None)
+- def set_reactor_count(count) # grow the reactor pool
+- def select_reactor(key=None) # least-loaded reactor, or one chosen by hash(key)
+- def get_reactor_list()
+- def call_later(delay, callback, *args) # scheduled on the first reactor
+- def call_every(interval, callback, *args)
+- def get_buffer_pool() # BufferPool shared by all connections
+- def is_reactor_thread() # True when called from any reactor's loop thread
+'''
+
+
+@Singleton
+class AsyncController(object):
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reactor_list = [AsyncReactor(0)]
+        # shared by every connection of the process
+        self.buffer_pool = BufferPool()
+
+    def set_reactor_count(self, count):
+        with self.lock:
+            if count < len(self.reactor_list):
+                raise ValueError('reactor count can only be increased')
+            while len(self.reactor_list) < count:
+                self.reactor_list.append(AsyncReactor(len(self.reactor_list)))
+
+    def get_buffer_pool(self):
+        return self.buffer_pool
+
+    def get_reactor_list(self):
+        with self.lock:
+            return list(self.reactor_list)
+
+    def is_reactor_thread(self):
+        return isinstance(threading.current_thread(), AsyncReactor)
+
+    def select_reactor(self, key=None):
+        with self.lock:
+            if key is not None:
+                return self.reactor_list[hash(key) % len(self.reactor_list)]
+            return min(self.reactor_list, key=lambda reactor: reactor.get_load())
+
+    def call_later(self, delay, callback, *args):
+        return self.reactor_list[0].call_later(delay, callback, *args)
+
+    def call_every(self, interval, callback, *args):
+        return self.reactor_list[0].call_every(interval, callback, *args)
+
+    def add(self, module, reactor=None):
+        if reactor is None:
+            reactor = self.select_reactor()
+        reactor.add(module)
+
+    def update(self, module):
+        if module.reactor is not None:
+            module.reactor.update(module)
+
+    def discard(self, module):
+        print('asyncController discard called')
+        if module.reactor is not None:
+            module.reactor.discard(module)
+
+    def clear(self):
+        for reactor in self.get_reactor_list():
+            reactor.clear()
+
+    def stop(self):
+        for reactor in self.get_reactor_list():
+            reactor.stop()
+
+    def join(self, timeout=None):
+        for reactor in self.get_reactor_list():
+            reactor.join(timeout)
+
+    def is_alive(self):
+        for reactor in self.get_reactor_list():
+            if reactor.is_alive():
+                return True
+        return False
+
 # foo = AsyncController.instance()
@@ -0,0 +1,296 @@
+#!/usr/bin/python
+"""
+@file async_dispatcher.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief AsyncDispatcher Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+AsyncDispatcher Class.
+
+Drop-in replacement for asyncore.dispatcher driven by the AsyncController
+reactor instead of the global asyncore socket map.
+"""
+import errno
+import os
+import socket
+import struct
+import sys
+
+from .async_controller import AsyncController
+
+DISCONNECTED = frozenset((errno.ECONNRESET, errno.ENOTCONN, errno.ESHUTDOWN,
+                          errno.ECONNABORTED, errno.EPIPE, errno.EBADF))
+HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+HAS_SENDFILE = hasattr(os, 'sendfile')
+# UDP generic segmentation offload, Linux 4.18+
+HAS_UDP_GSO = HAS_SENDMSG and sys.platform.startswith('linux')
+SOL_UDP = getattr(socket, 'SOL_UDP', 17)
+UDP_SEGMENT = getattr(socket, 'UDP_SEGMENT', 103)
+MAX_SENDFILE_CHUNK = 1 << 30
+
+'''
+Interfaces
+variables
+- socket
+- addr
+- connected
+- accepting
+- connecting
+- reactor # the AsyncReactor this dispatcher is registered with
+functions
+- def readable() # True if the reactor should wait for read events
+- def writable() # True if the reactor should wait for write events
+- def update_interest() # re-evaluate readable()/writable() on the reactor
+- def handle_read() / handle_write() / handle_accept() / handle_connect()
+- def handle_close() / handle_error()
+'''
+
+
+class AsyncDispatcher(object):
+    connected = False
+    accepting = False
+    connecting = False
+    addr = None
+    reactor = None
+
+    def __init__(self, sock=None):
+        self.socket = None
+        if sock is not None:
+            sock.setblocking(False)
+            self.socket = sock
+            self.connected = True
+            try:
+                self.addr = sock.getpeername()
+            except socket.error as e:
+                if e.errno in (errno.ENOTCONN, errno.EINVAL):
+                    self.connected = False
+                else:
+                    raise
+
+    def create_socket(self, family=socket.AF_INET, type=socket.SOCK_STREAM):
+        sock = socket.socket(family, type)
+        sock.setblocking(False)
+        self.socket = sock
+
+    def set_reuse_addr(self):
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR,
+                                   self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR) | 1)
+        except socket.error:
+            pass
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def update_interest(self):
+        if self.reactor is not None:
+            self.reactor.update(self)
+
+    def listen(self, num):
+        self.accepting = True
+        return self.socket.listen(num)
+
+    def bind(self, addr):
+        self.addr = addr
+        return self.socket.bind(addr)
+
+    def connect(self, address):
+        self.connected = False
+        self.connecting = True
+        err = self.socket.connect_ex(address)
+        if err in (errno.EINPROGRESS, errno.EALREADY, errno.EWOULDBLOCK) or (err == errno.EINVAL and os.name == 'nt'):
+            self.addr = address
+            return
+        if err in (0, errno.EISCONN):
+            self.addr = address
+            self.handle_connect_event()
+        else:
+            raise socket.error(err, errno.errorcode[err])
+
+    def accept(self):
+        try:
+            conn, addr = self.socket.accept()
+        except TypeError:
+            return None
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.ECONNABORTED, errno.EAGAIN):
+                return None
+            raise
+        return conn, addr
+
+    def send(self, data):
+        try:
+            return self.socket.send(data)
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                return 0
+            elif e.errno in DISCONNECTED:
+                self.handle_close()
+                return 0
+            raise
+
+    # unlike send, a dropped connection raises: the caller has to put its in-flight frames back before closing
+    def sendmsg(self, buffers):
+        try:
+            if HAS_SENDMSG:
+                return self.socket.sendmsg(buffers)
+            return self.socket.send(b''.join(buffers))
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                return 0
+            raise
+
+    # send up to count bytes of file starting at offset; zero-copy through os.sendfile where available.
+    # Raises on a dropped connection like sendmsg
+    def sendfile(self, file, offset, count):
+        count = min(count, MAX_SENDFILE_CHUNK)
+        try:
+            if HAS_SENDFILE:
+                return os.sendfile(self.socket.fileno(), file.fileno(), offset, count)
+            file.seek(offset)
+            return self.socket.send(file.read(min(count, 65536)))
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                return 0
+            raise
+
+    def recv(self, buffer_size):
+        try:
+            data = self.socket.recv(buffer_size)
+            if not data:
+                # a closed connection is signaled by a read event with no data
+                self.handle_close()
+                return b''
+            return data
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                return b''
+            elif e.errno in DISCONNECTED:
+                self.handle_close()
+                return b''
+            raise
+
+    def recv_into(self, buffer):
+        try:
+            received = self.socket.recv_into(buffer)
+            if not received:
+                self.handle_close()
+                return 0
+            return received
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                return 0
+            elif e.errno in DISCONNECTED:
+                self.handle_close()
+                return 0
+            raise
+
+    def sendto(self, data, addr):
+        return self.socket.sendto(data, addr)
+
+    # send the buffers to addr as datagrams of segment_size bytes each (the last may be shorter) with one call
+    def sendto_segments(self, buffers, segment_size, addr):
+        return self.socket.sendmsg(buffers, [(SOL_UDP, UDP_SEGMENT, struct.pack('=H', segment_size))], 0, addr)
+
+    def recvfrom(self, buffer_size):
+        return self.socket.recvfrom(buffer_size)
+
+    # returns (0, None) when there is nothing to read
+    def recvfrom_into(self, buffer):
+        try:
+            return self.socket.recvfrom_into(buffer)
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                return 0, None
+            raise
+
+    def close(self):
+        self.connected = False
+        self.accepting = False
+        self.connecting = False
+        # unregister before closing so the fd can't be reused while still in the selector
+        AsyncController.instance().discard(self)
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except socket.error as e:
+                if e.errno not in (errno.ENOTCONN, errno.EBADF):
+                    raise
+
+    def handle_read_event(self):
+        if self.accepting:
+            self.handle_accept()
+        elif not self.connected:
+            if self.connecting:
+                self.handle_connect_event()
+            self.handle_read()
+        else:
+            self.handle_read()
+
+    def handle_connect_event(self):
+        err = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err != 0:
+            raise socket.error(err, os.strerror(err))
+        self.handle_connect()
+        self.connected = True
+        self.connecting = False
+
+    def handle_write_event(self):
+        if self.accepting:
+            return
+        if not self.connected:
+            if self.connecting:
+                self.handle_connect_event()
+        self.handle_write()
+
+    def handle_read(self):
+        pass
+
+    def handle_write(self):
+        pass
+
+    def handle_connect(self):
+        pass
+
+    def handle_accept(self):
+        pass
+
+    def handle_error(self):
+        self.handle_close()
+
+    def handle_close(self):
+        self.close()
@@ -0,0 +1,272 @@
+#!/usr/bin/python
+"""
+@file async_frame_dispatcher.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief AsyncFrameDispatcher Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+AsyncFrameDispatcher Class.
+
+Framed TCP I/O shared by AsyncTcpSocket and AsyncTcpClient. Subclasses set
+up the callback, decoder and send queue and add how the connection is made
+and torn down.
+"""
+import os
+import socket
+import traceback
+
+from .async_dispatcher import AsyncDispatcher, DISCONNECTED
+from .server_conf import *
+from .preamble import *
+from .frame_compressor import DEFAULT_DECOMPRESSOR
+from pyserver.util.buffer_pool import PooledBuffer
+
+'''
+Interfaces
+variables
+- callback # ITcpSocketCallback
+- codec # FrameCodec for the wire layout
+- compressor # FrameCompressor for outgoing frames, None to send uncompressed
+- pooled_receive # on_received/on_request get a PooledBuffer (.view memoryview) that must be release()d
+- callback_dispatcher # CallbackDispatcher running callbacks off the reactor thread, None to run them inline
+- decoder # FrameDecoder for the receive side
+- writer # FrameWriter holding the send queue
+- rpc # RpcChannel matching responses to calls
+functions
+- def send(data) # returns State.SUCCESS, or State.FAIL_QUEUE_FULL above the high watermark
+- def send_data(data, flags=0, frame_id=0, overflow_policy=None) # send with header flags, compressing if configured
+- def send_frame(header, data, overflow_policy=None) # send with a header prebuilt by the codec
+- def call(data, timeout=None) # send an RPC request, returns concurrent.futures.Future
+- def respond(request_id, data) # answer a request received through callback.on_request
+- def send_file(path, frame_id=0) # send a file as one frame through sendfile, on_sent gets the path
+- def get_corruption_stats() # corruption events and bytes discarded while resyncing on this connection
+- def invoke_callback(name, *args) # run callback.<name>(self, *args), on the callback dispatcher if there is one
+'''
+
+
+class AsyncFrameDispatcher(AsyncDispatcher):
+    def handle_read(self):
+        try:
+            for data in self.decoder.read(self):
+                if self.decoder.streaming:
+                    self.invoke_callback('on_chunk', self.decoder.frame_id, data, self.decoder.is_last)
+                    continue
+                flags = self.decoder.frame_flags
+                if flags & FLAG_COMPRESSED:
+                    # decompress off the reactor thread, in order with the socket's other callbacks
+                    dispatcher = self.callback_dispatcher or self.get_decompressor().get_dispatcher()
+                    dispatcher.dispatch(self, self.handle_compressed, flags, self.decoder.frame_id, data)
+                    continue
+                if flags & FLAG_RPC_RESPONSE:
+                    self.handle_response(self.decoder.frame_id, data)
+                elif flags & FLAG_RPC_REQUEST:
+                    self.invoke_callback('on_request', self.decoder.frame_id, data)
+                else:
+                    self.invoke_callback('on_received', data)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+
+    # the connection's compressor, or the shared one for frames from compressing peers
+    def get_decompressor(self):
+        return self.compressor or DEFAULT_DECOMPRESSOR
+
+    def handle_response(self, request_id, data):
+        if self.pooled_receive:
+            # futures outlive the callback, so responses are always bytes
+            payload = data.tobytes()
+            data.release()
+            data = payload
+        self.rpc.handle_response(request_id, data)
+
+    # decompressed payloads are wrapped too when pooled receive is on, so callbacks always get one type
+    def decompress(self, data):
+        compressor = self.get_decompressor()
+        if not self.pooled_receive:
+            return compressor.decompress(data)
+        try:
+            payload = compressor.decompress(data.view)
+        finally:
+            data.release()
+        return PooledBuffer(None, payload, len(payload))
+
+    # runs on the callback or decompression pool, so the callback is called directly to keep its place in order
+    def handle_compressed(self, flags, frame_id, data):
+        data = self.decompress(data)
+        if flags & FLAG_RPC_RESPONSE:
+            self.handle_response(frame_id, data)
+            return
+        if self.callback is None:
+            return
+        if flags & FLAG_RPC_REQUEST:
+            self.callback.on_request(self, frame_id, data)
+        else:
+            self.callback.on_received(self, data)
+
+    # stop reading from a peer while its responses are not draining or its callbacks are backed up
+    def readable(self):
+        if self.pause_reading and self.writer.is_full():
+            return False
+        if self.callback_dispatcher is None:
+            decompressor = self.get_decompressor()
+            return decompressor.dispatcher is None or not decompressor.dispatcher.is_saturated(self)
+        return not self.callback_dispatcher.is_saturated(self)
+
+    def writable(self):
+        return self.writer.is_writable()
+
+    def handle_write(self):
+        state = State.SUCCESS
+        try:
+            completed = self.writer.write(self)
+        except Exception as e:
+            if isinstance(e, socket.error) and e.errno in DISCONNECTED:
+                # the writer has put its frames back whole, so a reconnecting client can replay them
+                self.handle_close()
+                return
+            print(e)
+            traceback.print_exc()
+            state = State.FAIL_SOCKET_ERROR
+            completed = self.writer.fail_all()
+        for send_obj in completed:
+            try:
+                if self.callback is not None:
+                    self.invoke_callback('on_sent', state, send_obj['data'])
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+
+    def handle_error(self):
+        if not self.is_closing:
+            self.handle_close()
+
+    def send(self, data):
+        return self.send_data(data)
+
+    # frame data, compressing it with the connection's compressor when it is large enough;
+    # on the reactor thread compression runs on the compressor's pool while the frame holds its place in the queue
+    def send_data(self, data, flags=0, frame_id=0, overflow_policy=None):
+        if overflow_policy is None:
+            overflow_policy = self.overflow_policy
+        can_block = self.reactor is None or not self.reactor.is_reactor_thread()
+        # requests are tagged with their id, so a reconnecting client knows which calls never left the queue
+        tag = frame_id if flags & FLAG_RPC_REQUEST else None
+        compressor = self.compressor
+        if compressor is None or not self.codec.has_frame_info or not compressor.should_compress(data):
+            state = self.writer.append(data, overflow_policy, can_block, self.codec.encode_header(len(data), flags, frame_id),
+                                       tag=tag)
+        elif can_block:
+            payload, flags = compressor.compress_frame(data, flags)
+            state = self.writer.append(data, overflow_policy, can_block,
+                                       self.codec.encode_header(len(payload), flags, frame_id), payload, tag)
+        else:
+            state, send_obj = self.writer.reserve(data, overflow_policy, can_block, tag)
+            if state == State.SUCCESS:
+                compressor.submit(self.fill_frame, send_obj, data, flags, frame_id)
+        self.update_interest()
+        return state
+
+    def fill_frame(self, send_obj, data, flags, frame_id):
+        try:
+            payload, flags = self.compressor.compress_frame(data, flags)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            payload = data
+        self.writer.fill(send_obj, self.codec.encode_header(len(payload), flags, frame_id), payload)
+        self.update_interest()
+
+    # queue an already built header with data; the buffers may be shared with other sockets
+    def send_frame(self, header, data, overflow_policy=None, payload=None):
+        if overflow_policy is None:
+            overflow_policy = self.overflow_policy
+        can_block = self.reactor is None or not self.reactor.is_reactor_thread()
+        state = self.writer.append(data, overflow_policy, can_block, header, payload)
+        self.update_interest()
+        return state
+
+    # send data as a request; the returned Future resolves with the peer's respond() payload
+    def call(self, data, timeout=None):
+        return self.rpc.call(data, timeout)
+
+    # answer a request received through callback.on_request
+    def respond(self, request_id, data):
+        return self.rpc.respond(request_id, data)
+
+    # frame a file and send its body with sendfile instead of reading it into memory
+    def send_file(self, path, frame_id=0, overflow_policy=None):
+        if overflow_policy is None:
+            overflow_policy = self.overflow_policy
+        if len(self.codec.trailer) != 0:
+            raise ValueError('send_file needs a length-prefixed codec')
+        file = open(path, 'rb')
+        size = os.fstat(file.fileno()).st_size
+        if size > MAX_FRAME_SIZE:
+            file.close()
+            raise ValueError('%s is larger than a frame can carry' % path)
+        can_block = self.reactor is None or not self.reactor.is_reactor_thread()
+        state = self.writer.append_file(file, size, self.codec.encode_header(size, 0, frame_id), path,
+                                        overflow_policy, can_block)
+        if state != State.SUCCESS:
+            file.close()
+        self.update_interest()
+        return state
+
+    # garbage skipped by the decoder on this connection, see FrameDecoder
+    def get_corruption_stats(self):
+        return self.decoder.get_corruption_stats()
+
+    # run a callback inline on the reactor thread, or in order on the callback dispatcher's pool
+    def invoke_callback(self, name, *args):
+        if self.callback is None:
+            return
+        dispatcher = self.callback_dispatcher
+        if dispatcher is None and self.get_decompressor().get_pending(self) != 0:
+            # frames are still being decompressed for this socket: queue behind them
+            dispatcher = self.get_decompressor().get_dispatcher()
+        if dispatcher is not None:
+            dispatcher.dispatch(self, getattr(self.callback, name), self, *args)
+            return
+        # a raising callback must not abandon the frames decoded after its own
+        try:
+            getattr(self.callback, name)(self, *args)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+
+    def handle_drain(self):
+        try:
+            if self.callback is not None:
+                self.invoke_callback('on_drain')
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
@@ -36,12 +36,6 @@ THE SOFTWARE.
 AsyncMulticast Class.
 """
 
-try:
-    from Queue import Queue
-except ImportError:
-    from queue import Queue
-
-import asyncore
 import socket
 import traceback
 import threading
@@ -49,6 +43,10 @@ import threading
 from .server_conf import *
 from .callback_interface import *
 from .async_controller import AsyncController
+from .async_dispatcher import AsyncDispatcher
+from .datagram_reader import DatagramReader
+from .datagram_writer import DatagramWriter
+from .pmtu_cache import UDP_IP_OVERHEAD
 # noinspection PyDeprecation
 
 try:
@@ -68,6 +66,9 @@ IP_PMTUDISC_PROBE = 3  # Ignore dst pmtu.
 Interfaces
 variables
 - callback_obj
+- reader # DatagramReader when batch_receive is on, datagrams are then delivered to on_received_batch
+- writer # DatagramWriter sending up to send_budget datagrams per writable event
+- fragmenter # DatagramFragmenter splitting sends and reassembling received messages, None to send single datagrams
 functions
 - def send(multicast_addr,port,data)
 - def close() # close the socket
@@ -81,7 +82,7 @@ infos
 '''
 
 
-class AsyncMulticast(asyncore.dispatcher):
+class AsyncMulticast(AsyncDispatcher):
     # enable_loopback : 1 enable loopback / 0 disable loopback
     # ttl: 0 - restricted to the same host
     #      1 - restricted to the same subnet
@@ -89,10 +90,15 @@ class AsyncMulticast(asyncore.dispatcher):
     #     64 - restricted to the same region
     #    128 - restricted to the same continent
     #    255 - unrestricted in scope
-    def __init__(self, port, callback_obj, ttl=1, enable_loopback=False, bind_addr=''):
-        asyncore.dispatcher.__init__(self)
+    def __init__(self, port, callback_obj, ttl=1, enable_loopback=False, bind_addr='', batch_receive=False,
+                 recv_budget=64, send_budget=256, fragmenter=None):
+        AsyncDispatcher.__init__(self)
         # self.lock = threading.RLock()
         self.MAX_MTU = 1500
+        self.fragmenter = fragmenter
+        self.reader = None
+        if batch_receive:
+            self.reader = DatagramReader(self.MAX_MTU, recv_budget)
         self.callback_obj = None
         self.port = port
         self.multicastSet = set([])
@@ -130,7 +136,7 @@ class AsyncMulticast(asyncore.dispatcher):
         except Exception as e:
             print(e)
             traceback.print_exc()
-        self.sendQueue = Queue()  # thread-safe queue
+        self.writer = DatagramWriter(send_budget)
         AsyncController.instance().add(self)
         if self.callback_obj is not None:
             self.callback_obj.on_started(self)
@@ -141,30 +147,42 @@ class AsyncMulticast(asyncore.dispatcher):
 
     # This is called everytime there is something to read
     def handle_read(self):
+        if self.reader is not None:
+            self.handle_read_batch()
+            return
         try:
             data, addr = self.recvfrom(self.MAX_MTU)
+            if data and self.fragmenter is not None:
+                data = self.fragmenter.reassemble(addr, data)
             if data and self.callback_obj is not None:
                 self.callback_obj.on_received(self, addr, data)
         except Exception as e:
             print(e)
             traceback.print_exc()
 
-    # def writable(self):
-    #    return not self.sendQueue.empty()
+    def handle_read_batch(self):
+        try:
+            batch = self.reader.read(self)
+            if self.fragmenter is not None:
+                batch = self.fragmenter.reassemble_batch(batch)
+            if len(batch) != 0 and self.callback_obj is not None:
+                self.callback_obj.on_received_batch(self, batch)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+
+    def writable(self):
+        return self.writer.is_writable()
 
-    # This is called all the time and causes errors if you leave it out.
+    # This is called when the socket is writable and the send queue is not empty
     def handle_write(self):
-        if not self.sendQueue.empty():
-            send_obj = self.sendQueue.get()
-            state = State.SUCCESS
-            try:
-                sent = self.sendto(send_obj['data'], (send_obj['hostname'], send_obj['port']))
-                if sent < len(send_obj['data']):
-                    state = State.FAIL_SOCKET_ERROR
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
-                state = State.FAIL_SOCKET_ERROR
+        try:
+            completed = self.writer.write(self)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            return
+        for send_obj, state in completed:
             try:
                 if self.callback_obj is not None:
                     self.callback_obj.on_sent(self, state, send_obj['data'])
@@ -193,8 +211,7 @@ class AsyncMulticast(asyncore.dispatcher):
             print(e)
 
         print('asyncUdp close called')
-        asyncore.dispatcher.close(self)
-        AsyncController.instance().discard(self)
+        AsyncDispatcher.close(self)
         try:
             if self.callback_obj is not None:
                 self.callback_obj.on_stopped(self)
@@ -204,8 +221,12 @@ class AsyncMulticast(asyncore.dispatcher):
 
     # noinspection PyMethodOverriding
     def send(self, hostname, port, data):
-        if len(data) <= self.MAX_MTU:
-            self.sendQueue.put({'hostname': hostname, 'port': port, 'data': data})
+        if self.fragmenter is not None:
+            self.writer.append_message(hostname, port, self.fragmenter.split(data, self.MAX_MTU - UDP_IP_OVERHEAD), data)
+            self.update_interest()
+        elif len(data) <= self.MAX_MTU:
+            self.writer.append(hostname, port, data)
+            self.update_interest()
         else:
             raise ValueError("The data size is too large")
 
@@ -35,16 +35,21 @@ THE SOFTWARE.
 
 AsyncTcpClient Class.
 """
-import asyncore
+import random
 import socket
-from collections import deque
 import threading
 
 from .async_controller import AsyncController
+from .async_dispatcher import AsyncDispatcher
+from .async_frame_dispatcher import AsyncFrameDispatcher
 from .callback_interface import *
 from .server_conf import *
 # noinspection PyDeprecation
 from .preamble import *
+from .frame_decoder import FrameDecoder
+from .frame_writer import FrameWriter
+from .frame_codec import DEFAULT_CODEC
+from .rpc_channel import RpcChannel
 import traceback
 '''
 Interfaces
@@ -53,15 +58,31 @@ variables
 - port
 - addr = (hostname,port)
 - callback
+- reconnect # reconnect with exponential backoff after a failed or lost connection
+- connect_timeout # seconds a connect may take before it is abandoned, None to wait for the OS
+- max_replay # queued frames kept for the next connection, None to keep all
+- stream_threshold # bodies of at least this many bytes go to callback.on_chunk as they arrive, None to disable
+- codec # FrameCodec for the wire layout (PreambleCodec, LengthPrefixCodec, VarintCodec, NewlineCodec)
+- compressor # FrameCompressor for outgoing frames, None to send uncompressed; needs a codec with frame info
+- pooled_receive # on_received/on_request get a PooledBuffer (.view memoryview) that must be release()d
 functions
-- def send(data)
+- def send(data) # returns State.SUCCESS, or State.FAIL_QUEUE_FULL above the high watermark
+- def send_data(data, flags=0, frame_id=0, overflow_policy=None) # send with header flags, compressing if configured
+- def send_frame(header, data, overflow_policy=None) # send with a header prebuilt by the codec
+- def send_file(path, frame_id=0) # send a file as one frame through sendfile, on_sent gets the path
+- def get_corruption_stats() # corruption events and bytes discarded while resyncing on this connection
+- def call(data, timeout=None) # send an RPC request, returns concurrent.futures.Future
+- def respond(request_id, data) # answer a request received through callback.on_request
 - def close() # close the socket
 '''
 
 
-class AsyncTcpClient(asyncore.dispatcher):
-    def __init__(self, hostname, port, callback, no_delay=True):
-        asyncore.dispatcher.__init__(self)
+class AsyncTcpClient(AsyncFrameDispatcher):
+    def __init__(self, hostname, port, callback, no_delay=True, high_watermark=None, low_watermark=None,
+                 overflow_policy=OverflowPolicy.RETURN, pause_reading=True, callback_dispatcher=None,
+                 reconnect=False, connect_timeout=None, backoff_min=0.1, backoff_max=30.0, max_replay=None,
+                 stream_threshold=None, codec=None, compressor=None, pooled_receive=False):
+        AsyncDispatcher.__init__(self)
         self.is_closing = False
         self.callback = None
         if callback is not None and isinstance(callback, ITcpSocketCallback):
@@ -71,13 +92,41 @@ class AsyncTcpClient(asyncore.dispatcher):
         self.hostname = hostname
         self.port = port
         self.addr = (hostname, port)
-        self.send_queue = deque()  # thread-safe dequeue
-        self.transport = {'packet': None, 'type': PacketType.SIZE, 'size': SIZE_PACKET_LENGTH, 'offset': 0}
-
-        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
-        if no_delay:
-            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        self.set_reuse_addr()
+        # optional CallbackDispatcher running callbacks off the reactor thread
+        self.callback_dispatcher = callback_dispatcher
+        self.overflow_policy = overflow_policy
+        self.pause_reading = pause_reading
+        # send queue limits in bytes, see FrameWriter
+        # wire layout of the frames, see FrameCodec
+        if codec is None:
+            codec = DEFAULT_CODEC
+        self.codec = codec
+        # optional FrameCompressor for outgoing frames
+        self.compressor = compressor
+        self.writer = FrameWriter(high_watermark, low_watermark, self.handle_drain, codec)
+        self.send_queue = self.writer.send_queue
+        # frames with bodies of at least stream_threshold bytes go to callback.on_chunk piece by piece
+        self.stream_threshold = stream_threshold
+        # hand payloads to on_received/on_request as PooledBuffer objects the callback must release()
+        self.pooled_receive = pooled_receive
+        self.decoder = FrameDecoder(stream_threshold=stream_threshold, codec=codec,
+                                    buffer_pool=AsyncController.instance().get_buffer_pool(), pooled=pooled_receive)
+        self.rpc = RpcChannel(self)
+        self.no_delay = no_delay
+        self.reconnect = reconnect
+        self.connect_timeout = connect_timeout
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.max_replay = max_replay
+        self.retry_count = 0
+        self.connect_timer = None
+        self.reconnect_timer = None
+
+        if self.reconnect:
+            # on_newconnection is called from handle_connect once each attempt succeeds
+            self.start_connect()
+            return
+        self.open_socket()
         err = None
         try:
             self.connect((hostname, port))
@@ -85,95 +134,110 @@ class AsyncTcpClient(asyncore.dispatcher):
         except Exception as e:
             err = e
         finally:
-            def callback_connection():
-                if self.callback is not None:
-                    self.callback.on_newconnection(self, err)
+            if self.callback_dispatcher is not None:
+                self.invoke_callback('on_newconnection', err)
+            else:
+                def callback_connection():
+                    if self.callback is not None:
+                        self.callback.on_newconnection(self, err)
 
-            thread = threading.Thread(target=callback_connection)
-            thread.start()
+                thread = threading.Thread(target=callback_connection)
+                thread.start()
 
-    def handle_connect(self):
-        pass
+    def open_socket(self):
+        self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.no_delay:
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.set_reuse_addr()
 
-    def handle_read(self):
+    def start_connect(self):
+        if not self.reconnect:
+            return
+        self.is_closing = False
+        self.decoder = FrameDecoder(stream_threshold=self.stream_threshold, codec=self.codec,
+                                    buffer_pool=AsyncController.instance().get_buffer_pool(), pooled=self.pooled_receive)
+        if self.reactor is None:
+            # keep one reactor across reconnects so the timers run on the thread doing the client's I/O
+            self.reactor = AsyncController.instance().select_reactor()
         try:
-            data = self.recv(self.transport['size'])
-            if data is None or len(data) == 0:
-                return
-            if self.transport['packet'] is None:
-                self.transport['packet'] = data
-            else:
-                self.transport['packet'] += data
-            read_size = len(data)
-            if read_size < self.transport['size']:
-                self.transport['offset'] += read_size
-                self.transport['size'] -= read_size
-            else:
-                if self.transport['type'] == PacketType.SIZE:
-                    should_receive = Preamble.to_should_receive(self.transport['packet'])
-                    if should_receive < 0:
-                        preamble_offset = Preamble.check_preamble(self.transport['packet'])
-                        self.transport['offset'] = len(self.transport['packet']) - preamble_offset
-                        self.transport['size'] = preamble_offset
-                        # self.transport['packet'] = self.transport['packet'][
-                        #                           len(self.transport['packet']) - preamble_offset:]
-                        self.transport['packet'] = self.transport['packet'][preamble_offset:]
-                        return
-                    self.transport = {'packet': None, 'type': PacketType.DATA, 'size': should_receive, 'offset': 0}
-                else:
-                    receive_packet = self.transport
-                    self.transport = {'packet': None, 'type': PacketType.SIZE, 'size': SIZE_PACKET_LENGTH, 'offset': 0}
-                    self.callback.on_received(self, receive_packet['packet'])
+            self.open_socket()
+            if self.connect_timeout is not None:
+                self.connect_timer = self.reactor.call_later(self.connect_timeout, self.check_connect)
+            self.connect(self.addr)
+            AsyncController.instance().add(self, self.reactor)
         except Exception as e:
             print(e)
             traceback.print_exc()
+            self.handle_close()
 
-    # def writable(self):
-    #    return len(self.send_queue) != 0
-
-    def handle_write(self):
-        if len(self.send_queue) != 0:
-            send_obj = self.send_queue.popleft()
-            state = State.SUCCESS
-            try:
-                sent = asyncore.dispatcher.send(self, send_obj['data'][send_obj['offset']:])
-                if sent < len(send_obj['data']):
-                    send_obj['offset'] = send_obj['offset'] + sent
-                    self.send_queue.appendleft(send_obj)
-                    return
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
-                state = State.FAIL_SOCKET_ERROR
-            try:
-                if self.callback is not None:
-                    self.callback.on_sent(self, state, send_obj['data'][SIZE_PACKET_LENGTH:])
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
-
-    def close(self):
-        if not self.is_closing:
+    def check_connect(self):
+        self.connect_timer = None
+        if self.connecting and not self.connected and not self.is_closing:
+            print('connect to %s:%d timed out' % self.addr)
             self.handle_close()
 
-    def handle_error(self):
+    # exponential backoff with equal jitter so clients of a restarted backend spread their attempts
+    def schedule_reconnect(self):
+        backoff = min(self.backoff_max, self.backoff_min * (2 ** min(self.retry_count, 32)))
+        self.retry_count += 1
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        self.reconnect_timer = self.reactor.call_later(delay, self.start_connect)
+
+    def handle_connect(self):
+        if self.connect_timer is not None:
+            self.connect_timer.cancel()
+            self.connect_timer = None
+        if self.reconnect:
+            self.retry_count = 0
+            # requests of calls that failed or timed out while queued are not sent late
+            for send_obj in self.writer.drop_tagged(self.rpc.is_pending):
+                self.invoke_callback('on_sent', State.FAIL_SOCKET_ERROR, send_obj['data'])
+            self.invoke_callback('on_newconnection', None)
+
+    def close(self):
+        if self.reconnect:
+            self.reconnect = False
+            if self.reconnect_timer is not None:
+                self.reconnect_timer.cancel()
+            if self.is_closing:
+                # waiting between attempts, nothing is registered
+                self.writer.close()
+                for send_obj in self.writer.fail_all():
+                    self.invoke_callback('on_sent', State.FAIL_SOCKET_ERROR, send_obj['data'])
+                return
         if not self.is_closing:
             self.handle_close()
 
     def handle_close(self):
         try:
+            was_connected = self.connected
             self.is_closing = True
-            asyncore.dispatcher.close(self)
-            AsyncController.instance().discard(self)
+            if self.connect_timer is not None:
+                self.connect_timer.cancel()
+                self.connect_timer = None
+            if self.reconnect:
+                # keep the queue for the next connection, resending a partly written frame from its start
+                AsyncDispatcher.close(self)
+                self.writer.rewind()
+                if self.max_replay is not None:
+                    for send_obj in self.writer.trim(self.max_replay):
+                        self.invoke_callback('on_sent', State.FAIL_SOCKET_ERROR, send_obj['data'])
+                # calls whose requests are still queued go out on the next connection and stay pending;
+                # the rest may have reached the peer, so they fail rather than being sent twice
+                self.rpc.fail_all(ConnectionError('connection closed'), self.writer.get_tags())
+                if was_connected:
+                    self.invoke_callback('on_disconnect')
+                self.schedule_reconnect()
+                return
+            self.writer.close()
+            self.rpc.fail_all(ConnectionError('connection closed'))
+            AsyncDispatcher.close(self)
             if self.callback is not None:
-                self.callback.on_disconnect(self)
+                self.invoke_callback('on_disconnect')
         except Exception as e:
             print(e)
             traceback.print_exc()
 
-    def send(self, data):
-        self.send_queue.append({'data': Preamble.to_preamble_packet(len(data)) + data, 'offset': 0})
-
     def gethostbyname(self, arg):
         return self.socket.gethostbyname(arg)
 
@@ -0,0 +1,181 @@
+#!/usr/bin/python
+"""
+@file async_tcp_client_pool.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief AsyncTcpClientPool Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+AsyncTcpClientPool Class.
+
+Keeps size warm AsyncTcpClient connections spread over one or more backends
+and sends on the connection with the fewest queued bytes. Closed or failed
+connections are evicted and reopened from the reactor's timer after
+retry_delay seconds.
+"""
+import threading
+import traceback
+from concurrent.futures import Future
+
+from .async_controller import AsyncController
+from .async_tcp_client import AsyncTcpClient
+from .callback_interface import *
+from .server_conf import *
+
+'''
+Interfaces
+variables
+- backend_list # list of (hostname, port), connections are spread round-robin
+- size # number of connections kept open
+- callback # ITcpSocketCallback receiving every pooled client's events
+functions
+- def send(data) # send on the least busy connection, returns State
+- def call(data, timeout=None) # RPC call on the least busy connection, returns concurrent.futures.Future
+- def select_client() # least busy connected client, or None
+- def get_client_list()
+- def get_connected_count()
+- def close() # close every connection and stop replacing them
+'''
+
+
+class PoolSocketCallback(ITcpSocketCallback):
+    def __init__(self, pool, callback):
+        self.pool = pool
+        self.callback = callback
+
+    def on_newconnection(self, sock, err):
+        if err is not None:
+            self.pool.evict(sock)
+        self.callback.on_newconnection(sock, err)
+
+    def on_disconnect(self, sock):
+        self.pool.evict(sock)
+        self.callback.on_disconnect(sock)
+
+    def on_received(self, sock, data):
+        self.callback.on_received(sock, data)
+
+    def on_request(self, sock, request_id, data):
+        self.callback.on_request(sock, request_id, data)
+
+    def on_sent(self, sock, status, data):
+        self.callback.on_sent(sock, status, data)
+
+    def on_chunk(self, sock, frame_id, chunk, is_last):
+        self.callback.on_chunk(sock, frame_id, chunk, is_last)
+
+    def on_drain(self, sock):
+        self.callback.on_drain(sock)
+
+    def on_idle(self, sock):
+        self.callback.on_idle(sock)
+
+
+class AsyncTcpClientPool(object):
+    def __init__(self, backend_list, size, callback, retry_delay=1.0, **client_kwargs):
+        if callback is None or not isinstance(callback, ITcpSocketCallback):
+            raise Exception('callback is None or not an instance of ITcpSocketCallback class')
+        if len(backend_list) == 0:
+            raise ValueError('backend_list is empty')
+        self.lock = threading.RLock()
+        self.backend_list = list(backend_list)
+        self.size = size
+        self.callback = callback
+        self.socket_callback = PoolSocketCallback(self, callback)
+        self.retry_delay = retry_delay
+        self.client_kwargs = client_kwargs
+        self.client_list = [None] * size
+        self.is_closing = False
+        for index in range(size):
+            self.connect(index)
+
+    def connect(self, index):
+        with self.lock:
+            if self.is_closing:
+                return
+            hostname, port = self.backend_list[index % len(self.backend_list)]
+            try:
+                # a failed connect reports through on_newconnection, which evicts the slot again
+                self.client_list[index] = AsyncTcpClient(hostname, port, self.socket_callback, **self.client_kwargs)
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+                self.client_list[index] = None
+                AsyncController.instance().call_later(self.retry_delay, self.connect, index)
+
+    def evict(self, client):
+        with self.lock:
+            if client not in self.client_list:
+                return
+            index = self.client_list.index(client)
+            self.client_list[index] = None
+            if self.is_closing:
+                return
+        client.close()
+        AsyncController.instance().call_later(self.retry_delay, self.connect, index)
+
+    def select_client(self):
+        selected = None
+        with self.lock:
+            for client in self.client_list:
+                if client is None or not client.connected or client.is_closing:
+                    continue
+                if selected is None or client.writer.queued_bytes < selected.writer.queued_bytes:
+                    selected = client
+        return selected
+
+    def send(self, data):
+        client = self.select_client()
+        if client is None:
+            return State.FAIL_SOCKET_ERROR
+        return client.send(data)
+
+    def call(self, data, timeout=None):
+        client = self.select_client()
+        if client is None:
+            future = Future()
+            future.set_exception(ConnectionError('no connected client in the pool'))
+            return future
+        return client.call(data, timeout)
+
+    def get_client_list(self):
+        with self.lock:
+            return [client for client in self.client_list if client is not None]
+
+    def get_connected_count(self):
+        return len([client for client in self.get_client_list() if client.connected and not client.is_closing])
+
+    def close(self):
+        with self.lock:
+            self.is_closing = True
+            client_list = self.get_client_list()
+            self.client_list = [None] * self.size
+        for client in client_list:
+            client.close()
@@ -35,12 +35,13 @@ THE SOFTWARE.
 
 AsyncTcpServer Class.
 """
-import asyncore
 import socket
 import threading
-from collections import deque
+import time
 
 from .async_controller import AsyncController
+from .async_dispatcher import AsyncDispatcher
+from .async_frame_dispatcher import AsyncFrameDispatcher
 from .callback_interface import *
 from .server_conf import *
 # noinspection PyDeprecation
@@ -50,6 +51,10 @@ except NameError:
     from sets import Set as set
 
 from .preamble import *
+from .frame_decoder import FrameDecoder
+from .frame_writer import FrameWriter
+from .frame_codec import DEFAULT_CODEC
+from .rpc_channel import RpcChannel
 import traceback
 import copy
 
@@ -58,15 +63,25 @@ Interfaces
 variable
 - addr
 - callback
+- idle_timeout # seconds without traffic before callback.on_idle(sock), None to disable
+- topic_set # topics this socket is subscribed to on its server
 function
-- def send(data)
+- def send(data) # returns State.SUCCESS, or State.FAIL_QUEUE_FULL above the high watermark
+- def send_data(data, flags=0, frame_id=0, overflow_policy=None) # send with header flags, compressing if configured
+- def subscribe(topic) / unsubscribe(topic) # shortcuts for server.subscribe(sock, topic)
+- def register() # start receiving events on the socket's reactor, called by the server after on_newconnection
+- def send_frame(header, data, overflow_policy=None) # send with a header prebuilt by the codec
+- def send_file(path, frame_id=0) # send a file as one frame through sendfile, on_sent gets the path
+- def get_corruption_stats() # corruption events and bytes discarded while resyncing on this connection
+- def call(data, timeout=None) # send an RPC request, returns concurrent.futures.Future
+- def respond(request_id, data) # answer a request received through callback.on_request
 - def close() # close the socket
 '''
 
 
-class AsyncTcpSocket(asyncore.dispatcher):
-    def __init__(self, server, sock, addr, callback):
-        asyncore.dispatcher.__init__(self, sock)
+class AsyncTcpSocket(AsyncFrameDispatcher):
+    def __init__(self, server, sock, addr, callback, reactor=None):
+        AsyncDispatcher.__init__(self, sock)
         self.server = server
         self.is_closing = False
         self.callback = None
@@ -75,94 +90,86 @@ class AsyncTcpSocket(asyncore.dispatcher):
         else:
             raise Exception('callback is None or not an instance of ITcpSocketCallback class')
         self.addr = addr
-        self.transport = {'packet': None, 'type': PacketType.SIZE, 'size': SIZE_PACKET_LENGTH, 'offset': 0}
-        self.send_queue = deque()  # thread-safe queue
+        self.topic_set = set([])
+        self.codec = self.server.codec
+        self.compressor = self.server.compressor
+        self.pooled_receive = self.server.pooled_receive
+        self.decoder = FrameDecoder(stream_threshold=self.server.stream_threshold, codec=self.codec,
+                                    buffer_pool=AsyncController.instance().get_buffer_pool(), pooled=self.pooled_receive)
+        self.rpc = RpcChannel(self)
+        self.callback_dispatcher = self.server.callback_dispatcher
+        self.overflow_policy = self.server.overflow_policy
+        self.pause_reading = self.server.pause_reading
+        self.writer = FrameWriter(self.server.high_watermark, self.server.low_watermark, self.handle_drain, self.codec)
+        self.send_queue = self.writer.send_queue
         if self.server.no_delay:
             self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        AsyncController.instance().add(self)
-        if callback is not None:
-            self.callback.on_newconnection(self, None)
+        self.idle_timeout = self.server.idle_timeout
+        self.idle_timer = None
+        self.last_activity = time.monotonic()
+        # the reactor the socket will run on; it receives no events until register()
+        self.reactor = reactor
+
+    # called by the server once the socket is in its socket set and on_newconnection was delivered,
+    # so no read or close on the socket's reactor can overtake either
+    def register(self):
+        if self.is_closing:
+            return
+        AsyncController.instance().add(self, self.reactor)
+        if self.idle_timeout is not None:
+            self.idle_timer = self.reactor.call_later(self.idle_timeout, self.check_idle)
 
     def handle_read(self):
-        try:
-            data = self.recv(self.transport['size'])
-            if data is None or len(data) == 0:
-                return
-            if self.transport['packet'] is None:
-                self.transport['packet'] = data
-            else:
-                self.transport['packet'] += data
-            read_size = len(data)
-            if read_size < self.transport['size']:
-                self.transport['offset'] += read_size
-                self.transport['size'] -= read_size
-            else:
-                if self.transport['type'] == PacketType.SIZE:
-                    should_receive = Preamble.to_should_receive(self.transport['packet'])
-                    if should_receive < 0:
-                        preamble_offset = Preamble.check_preamble(self.transport['packet'])
-                        self.transport['offset'] = len(self.transport['packet']) - preamble_offset
-                        self.transport['size'] = preamble_offset
-                        # self.transport['packet'] = self.transport['packet'][
-                        #                           len(self.transport['packet']) - preamble_offset:]
-                        self.transport['packet'] = self.transport['packet'][preamble_offset:]
-                        return
-                    self.transport = {'packet': None, 'type': PacketType.DATA, 'size': should_receive, 'offset': 0}
-                else:
-                    receive_packet = self.transport
-                    self.transport = {'packet': None, 'type': PacketType.SIZE, 'size': SIZE_PACKET_LENGTH, 'offset': 0}
-                    self.callback.on_received(self, receive_packet['packet'])
-        except Exception as e:
-            print(e)
-            traceback.print_exc()
-
-    # def writable(self):
-    #    return len(self.send_queue) != 0
+        self.last_activity = time.monotonic()
+        AsyncFrameDispatcher.handle_read(self)
 
     def handle_write(self):
-        if len(self.send_queue) != 0:
-            send_obj = self.send_queue.popleft()
-            state = State.SUCCESS
-            try:
-                sent = asyncore.dispatcher.send(self, send_obj['data'][send_obj['offset']:])
-                if sent < len(send_obj['data']):
-                    send_obj['offset'] = send_obj['offset'] + sent
-                    self.send_queue.appendleft(send_obj)
-                    return
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
-                state = State.FAIL_SOCKET_ERROR
-            try:
-                if self.callback is not None:
-                    self.callback.on_sent(self, state, send_obj['data'][SIZE_PACKET_LENGTH:])
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
+        self.last_activity = time.monotonic()
+        AsyncFrameDispatcher.handle_write(self)
 
     def close(self):
         if not self.is_closing:
             self.handle_close()
 
-    def handle_error(self):
-        if not self.is_closing:
-            self.handle_close()
-
     def handle_close(self):
         try:
             print('asyncTcpSocket close called')
             self.is_closing = True
-            asyncore.dispatcher.close(self)
+            self.writer.close()
+            self.rpc.fail_all(ConnectionError('connection closed'))
+            if self.idle_timer is not None:
+                self.idle_timer.cancel()
+            AsyncDispatcher.close(self)
             self.server.discard_socket(self)
-            AsyncController.instance().discard(self)
             if self.callback is not None:
-                self.callback.on_disconnect(self)
+                self.invoke_callback('on_disconnect')
         except Exception as e:
             print(e)
             traceback.print_exc()
 
-    def send(self, data):
-        self.send_queue.append({'data': Preamble.to_preamble_packet(len(data)) + data, 'offset': 0})
+    def subscribe(self, topic):
+        return self.server.subscribe(self, topic)
+
+    def unsubscribe(self, topic):
+        self.server.unsubscribe(self, topic)
+
+    # one wheel timer per connection, re-armed for the remaining time instead of on every read
+    def check_idle(self):
+        if self.is_closing:
+            return
+        idle_time = time.monotonic() - self.last_activity
+        remaining = self.idle_timeout - idle_time
+        if remaining <= 0:
+            self.last_activity = time.monotonic()
+            remaining = self.idle_timeout
+            try:
+                if self.callback is not None:
+                    self.invoke_callback('on_idle')
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+        if not self.is_closing:
+            self.idle_timer = self.reactor.call_later(remaining, self.check_idle)
 
     def gethostbyname(self, arg):
         return self.socket.gethostbyname(arg)
@@ -176,19 +183,37 @@ Interfaces
 variables
 - callback
 - acceptor
+- backlog # listen backlog
+- accept_batch # max connections accepted per readiness event
+- max_accept_rate # accepted connections per second, None for unlimited
+- stream_threshold # bodies of at least this many bytes go to callback.on_chunk as they arrive, None to disable
+- codec # FrameCodec for the wire layout (PreambleCodec, LengthPrefixCodec, VarintCodec, NewlineCodec)
+- compressor # FrameCompressor for outgoing frames, None to send uncompressed; needs a codec with frame info
+- pooled_receive # on_received/on_request get a PooledBuffer (.view memoryview) that must be release()d
 functions
 - def close() # close the socket
 - def getSockList()
 - def shutdownAllClient()
+- def get_accept_stats() # accepted / refused / throttled counters
+- def broadcast(data, filter=None) # send data to every (filtered) socket, returns delivery counters
+- def subscribe(sock, topic) / unsubscribe(sock, topic) # subscribe returns State.FAIL_SOCKET_ERROR for a closed socket
+- def publish(topic, data) # send data to the topic's subscribers, returns delivery counters
+- def get_subscriber_list(topic)
+- def get_topic_list()
 '''
 
 
-class AsyncTcpServer(asyncore.dispatcher):
-    def __init__(self, port, callback, acceptor, bind_addr='', no_delay=True):
-        asyncore.dispatcher.__init__(self)
+class AsyncTcpServer(AsyncDispatcher):
+    def __init__(self, port, callback, acceptor, bind_addr='', no_delay=True, reactor_policy=ReactorPolicy.LEAST_LOADED,
+                 reuse_port=False, idle_timeout=None, high_watermark=None, low_watermark=None,
+                 overflow_policy=OverflowPolicy.RETURN, pause_reading=True, callback_dispatcher=None,
+                 backlog=socket.SOMAXCONN, accept_batch=64, max_accept_rate=None, stream_threshold=None,
+                 codec=None, compressor=None, pooled_receive=False):
+        AsyncDispatcher.__init__(self)
         self.is_closing = False
         self.lock = threading.RLock()
         self.sock_set = set([])
+        self.topic_map = {}  # topic -> set of subscribed sockets
 
         self.acceptor = None
         if acceptor is not None and isinstance(acceptor, IAcceptor):
@@ -202,32 +227,108 @@ class AsyncTcpServer(asyncore.dispatcher):
             raise Exception('callback is None or not an instance of ITcpServerCallback class')
         self.port = port
         self.no_delay = no_delay
+        self.reactor_policy = reactor_policy
+        self.idle_timeout = idle_timeout
+        # frames with bodies of at least stream_threshold bytes go to the socket callback's on_chunk piece by piece
+        self.stream_threshold = stream_threshold
+        # wire layout shared by every accepted socket, see FrameCodec
+        if codec is None:
+            codec = DEFAULT_CODEC
+        self.codec = codec
+        # optional FrameCompressor shared by the accepted sockets for outgoing frames
+        self.compressor = compressor
+        # sockets hand payloads to on_received/on_request as PooledBuffer objects the callback must release()
+        self.pooled_receive = pooled_receive
+        # per-connection send queue limits in bytes, see FrameWriter
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.overflow_policy = overflow_policy
+        self.pause_reading = pause_reading
+        # optional CallbackDispatcher running the accepted sockets' callbacks off the reactor thread
+        self.callback_dispatcher = callback_dispatcher
+        self.backlog = backlog
+        self.accept_batch = accept_batch
+        # token bucket holding up to one second worth of accepts, and at least one so rates below 1/s still accept
+        self.max_accept_rate = max_accept_rate
+        self.accept_tokens = max(1, max_accept_rate) if max_accept_rate is not None else None
+        self.accept_refill_time = time.monotonic()
+        self.accept_paused = False
+        self.accepted_count = 0
+        self.refused_count = 0
+        self.throttled_count = 0
         self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
         self.set_reuse_addr()
+        if reuse_port:
+            # lets pre-forked workers bind the same port; the kernel balances accepts between them
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.bind((bind_addr, port))
-        self.listen(5)
+        self.listen(self.backlog)
 
         AsyncController.instance().add(self)
         if self.callback is not None:
             self.callback.on_started(self)
 
+    def readable(self):
+        return not self.accept_paused
+
+    # drain up to accept_batch pending connections per event so reconnect storms clear quickly
     def handle_accept(self):
-        try:
-            sock_pair = self.accept()
-            if sock_pair is not None:
+        for _ in range(self.accept_batch):
+            if self.max_accept_rate is not None and not self.has_accept_token():
+                self.pause_accept()
+                return
+            try:
+                sock_pair = self.accept()
+                if sock_pair is None:
+                    return
+                if self.max_accept_rate is not None:
+                    self.accept_tokens -= 1
                 sock, addr = sock_pair
                 if not self.acceptor.on_accept(self, addr):
+                    self.refused_count += 1
                     sock.close()
                 else:
                     sockcallback = self.acceptor.get_socket_callback()
-                    sock_obj = AsyncTcpSocket(self, sock, addr, sockcallback)
+                    if self.reactor_policy == ReactorPolicy.HASH:
+                        reactor = AsyncController.instance().select_reactor(addr)
+                    else:
+                        reactor = AsyncController.instance().select_reactor()
+                    sock_obj = AsyncTcpSocket(self, sock, addr, sockcallback, reactor)
+                    self.accepted_count += 1
                     with self.lock:
                         self.sock_set.add(sock_obj)
-                    if self.callback is not None:
-                        self.callback.on_accepted(self, sock_obj)
-        except Exception as e:
-            print(e)
-            traceback.print_exc()
+                    try:
+                        sock_obj.invoke_callback('on_newconnection', None)
+                        if self.callback is not None:
+                            self.callback.on_accepted(self, sock_obj)
+                    except Exception as e:
+                        print(e)
+                        traceback.print_exc()
+                    sock_obj.register()
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+                return
+
+    def has_accept_token(self):
+        now = time.monotonic()
+        self.accept_tokens = min(max(1, self.max_accept_rate),
+                                 self.accept_tokens + (now - self.accept_refill_time) * self.max_accept_rate)
+        self.accept_refill_time = now
+        return self.accept_tokens >= 1
+
+    # leave the remaining connections in the kernel backlog until the bucket refills
+    def pause_accept(self):
+        self.accept_paused = True
+        self.throttled_count += 1
+        self.reactor.call_later((1 - self.accept_tokens) / self.max_accept_rate, self.resume_accept)
+
+    def resume_accept(self):
+        self.accept_paused = False
+        self.update_interest()
+
+    def get_accept_stats(self):
+        return {'accepted': self.accepted_count, 'refused': self.refused_count, 'throttled': self.throttled_count}
 
     def close(self):
         if not self.is_closing:
@@ -246,8 +347,8 @@ class AsyncTcpServer(asyncore.dispatcher):
                 for item in delete_set:
                     item.close()
                 self.sock_set = set([])
-            asyncore.dispatcher.close(self)
-            AsyncController.instance().discard(self)
+                self.topic_map = {}
+            AsyncDispatcher.close(self)
             if self.callback is not None:
                 self.callback.on_stopped(self)
         except Exception as e:
@@ -258,6 +359,9 @@ class AsyncTcpServer(asyncore.dispatcher):
         print('asyncTcpServer discard socket called')
         with self.lock:
             self.sock_set.discard(sock)
+            for topic in sock.topic_set:
+                self.remove_subscriber(sock, topic)
+            sock.topic_set = set([])
 
     def shutdown_all(self):
         with self.lock:
@@ -265,7 +369,95 @@ class AsyncTcpServer(asyncore.dispatcher):
             for item in delete_set:
                 item.close()
             self.sock_set = set([])
+            self.topic_map = {}
 
     def get_socket_list(self):
         with self.lock:
             return list(self.sock_set)
+
+    def broadcast(self, data, filter=None):
+        sock_list = self.get_socket_list()
+        if filter is not None:
+            sock_list = [sock for sock in sock_list if filter(sock)]
+        return self.fan_out(sock_list, data)
+
+    def subscribe(self, sock, topic):
+        with self.lock:
+            if sock not in self.sock_set:
+                # closed, or not a socket of this server
+                return State.FAIL_SOCKET_ERROR
+            if topic not in self.topic_map:
+                self.topic_map[topic] = set([])
+            self.topic_map[topic].add(sock)
+            sock.topic_set.add(topic)
+        return State.SUCCESS
+
+    def unsubscribe(self, sock, topic):
+        with self.lock:
+            sock.topic_set.discard(topic)
+            self.remove_subscriber(sock, topic)
+
+    def remove_subscriber(self, sock, topic):
+        subscriber_set = self.topic_map.get(topic)
+        if subscriber_set is not None:
+            subscriber_set.discard(sock)
+            if len(subscriber_set) == 0:
+                del self.topic_map[topic]
+
+    def get_subscriber_list(self, topic):
+        with self.lock:
+            return list(self.topic_map.get(topic, ()))
+
+    def get_topic_list(self):
+        with self.lock:
+            return list(self.topic_map)
+
+    def publish(self, topic, data):
+        return self.fan_out(self.get_subscriber_list(topic), data)
+
+    # frame once and queue the same immutable buffers on every socket; full queues are skipped, never waited on
+    def fan_out(self, sock_list, data):
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        stats = {'sent': 0, 'queue_full': 0, 'failed': 0}
+        # compressed once for every socket
+        flags = 0
+        payload = data
+        if self.compressor is not None and self.codec.has_frame_info and self.compressor.should_compress(data):
+            if AsyncController.instance().is_reactor_thread():
+                # called from a callback: the frames hold their places while the pool compresses
+                reserved = []
+                for sock in sock_list:
+                    state, send_obj = sock.writer.reserve(data, OverflowPolicy.RETURN, False)
+                    self.count_state(stats, state)
+                    if state == State.SUCCESS:
+                        reserved.append((sock, send_obj))
+                if len(reserved) != 0:
+                    self.compressor.submit(self.fill_fan_out, reserved, data)
+                return stats
+            payload, flags = self.compressor.compress_frame(data)
+        header = self.codec.encode_header(len(payload), flags)
+        for sock in sock_list:
+            self.count_state(stats, sock.send_frame(header, data, OverflowPolicy.RETURN, payload))
+        return stats
+
+    # runs on the compressor's pool for a fan_out from a reactor thread
+    def fill_fan_out(self, reserved, data):
+        try:
+            payload, flags = self.compressor.compress_frame(data)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            payload, flags = data, 0
+        header = self.codec.encode_header(len(payload), flags)
+        for sock, send_obj in reserved:
+            sock.writer.fill(send_obj, header, payload)
+            sock.update_interest()
+
+    def count_state(self, stats, state):
+        if state == State.SUCCESS:
+            stats['sent'] += 1
+        elif state == State.FAIL_QUEUE_FULL:
+            stats['queue_full'] += 1
+        else:
+            stats['failed'] += 1
@@ -35,17 +35,17 @@ THE SOFTWARE.
 
 AsyncUDP Class.
 """
-try:
-    from Queue import Queue
-except ImportError:
-    from queue import Queue
-
-import asyncore
+import errno
 import socket
 import traceback
 from .callback_interface import *
 from .server_conf import *
 from .async_controller import AsyncController
+from .async_dispatcher import AsyncDispatcher
+from .datagram_reader import DatagramReader
+from .datagram_writer import DatagramWriter
+from .reliable_datagram import ReliableDatagram
+from .pmtu_cache import PmtuCache, UDP_IP_OVERHEAD
 
 IP_MTU_DISCOVER = 10
 IP_PMTUDISC_DONT = 0  # Never send DF frames.
@@ -57,17 +57,30 @@ IP_PMTUDISC_PROBE = 3  # Ignore dst pmtu.
 Interfaces
 variables
 - callback
+- reader # DatagramReader when batch_receive is on, datagrams are then delivered to on_received_batch
+- writer # DatagramWriter sending up to send_budget datagrams per writable event
+- fragmenter # DatagramFragmenter splitting sends and reassembling received messages, None to send single datagrams
+- reliable # ReliableDatagram when reliable is on: sends are retransmitted until acknowledged and on_sent reports the ack
+- mtu_cache # PmtuCache limiting send() payloads to the path MTU, None to use MAX_MTU
 functions
 - def send(host,port,data)
+- def get_payload_size(host,port) # largest datagram payload fitting one IP packet to the destination, the fragment size
+- def check_mtu_size(host,port) # path MTU to the destination
 - def close() # close the socket
 '''
 
 
-class AsyncUDP(asyncore.dispatcher):
-    def __init__(self, port, callback, bindaddress=''):
-        asyncore.dispatcher.__init__(self)
+class AsyncUDP(AsyncDispatcher):
+    def __init__(self, port, callback, bindaddress='', batch_receive=False, recv_budget=64, send_budget=256,
+                 fragmenter=None, reliable=False, ordered=True, mtu_cache=None, max_mtu=1500):
+        AsyncDispatcher.__init__(self)
         # self.lock = threading.RLock()
-        self.MAX_MTU = 1500
+        self.MAX_MTU = max_mtu
+        self.mtu_cache = mtu_cache
+        self.fragmenter = fragmenter
+        self.reader = None
+        if batch_receive:
+            self.reader = DatagramReader(self.MAX_MTU, recv_budget)
         self.callback = None
         self.port = port
         if callback is not None and isinstance(callback, IUdpCallback):
@@ -81,10 +94,16 @@ class AsyncUDP(asyncore.dispatcher):
             # self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.set_reuse_addr()
             self.bind((bindaddress, port))
+            if self.mtu_cache is not None:
+                # never fragment: oversized sends fail with EMSGSIZE, which refreshes the cached path MTU
+                self.socket.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
         except Exception as e:
             print(e)
             traceback.print_exc()
-        self.send_queue = Queue()  # thread-safe queue
+        self.writer = DatagramWriter(send_budget)
+        self.reliable = None
+        if reliable:
+            self.reliable = ReliableDatagram(self, ordered)
         AsyncController.instance().add(self)
         if self.callback is not None:
             self.callback.on_started(self)
@@ -95,30 +114,56 @@ class AsyncUDP(asyncore.dispatcher):
 
     # This is called everytime there is something to read
     def handle_read(self):
+        if self.reader is not None:
+            self.handle_read_batch()
+            return
         try:
             data, addr = self.recvfrom(self.MAX_MTU)
-            if data and self.callback is not None:
-                self.callback.on_received(self, addr, data)
+            if self.reliable is None:
+                self.deliver(addr, data)
+                return
+            for addr, data in self.reliable.receive_batch([(addr, data)]):
+                self.deliver(addr, data)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+
+    def deliver(self, addr, data):
+        if data and self.fragmenter is not None:
+            data = self.fragmenter.reassemble(addr, data)
+        if data and self.callback is not None:
+            self.callback.on_received(self, addr, data)
+
+    def handle_read_batch(self):
+        try:
+            batch = self.reader.read(self)
+            if self.reliable is not None:
+                batch = self.reliable.receive_batch(batch)
+                if self.fragmenter is None:
+                    batch = [(addr, memoryview(data)) for addr, data in batch]
+            if self.fragmenter is not None:
+                batch = self.fragmenter.reassemble_batch(batch)
+            if len(batch) != 0 and self.callback is not None:
+                self.callback.on_received_batch(self, batch)
         except Exception as e:
             print(e)
             traceback.print_exc()
 
-    # def writable(self):
-    #    return not self.send_queue.empty()
+    def writable(self):
+        return self.writer.is_writable()
 
-    # This is called all the time and causes errors if you leave it out.
+    # This is called when the socket is writable and the send queue is not empty
     def handle_write(self):
-        if not self.send_queue.empty():
-            send_obj = self.send_queue.get()
-            state = State.SUCCESS
-            try:
-                sent = self.sendto(send_obj['data'], (send_obj['hostname'], send_obj['port']))
-                if sent < len(send_obj['data']):
-                    state = State.FAIL_SOCKET_ERROR
-            except Exception as e:
-                print(e)
-                traceback.print_exc()
-                state = State.FAIL_SOCKET_ERROR
+        try:
+            completed = self.writer.write(self)
+        except Exception as e:
+            print(e)
+            traceback.print_exc()
+            return
+        if self.reliable is not None:
+            # reliable sends are reported when acknowledged
+            return
+        for send_obj, state in completed:
             try:
                 if self.callback is not None:
                     self.callback.on_sent(self, state, send_obj['data'])
@@ -134,8 +179,9 @@ class AsyncUDP(asyncore.dispatcher):
 
     def handle_close(self):
         print('asyncUdp close called')
-        asyncore.dispatcher.close(self)
-        AsyncController.instance().discard(self)
+        AsyncDispatcher.close(self)
+        if self.reliable is not None:
+            self.reliable.fail_all()
         try:
             if self.callback is not None:
                 self.callback.on_stopped(self)
@@ -145,8 +191,23 @@ class AsyncUDP(asyncore.dispatcher):
 
     # noinspection PyMethodOverriding
     def send(self, hostname, port, data):
-        if len(data) <= self.MAX_MTU:
-            self.send_queue.put({'hostname': hostname, 'port': port, 'data': data})
+        if self.reliable is not None:
+            payload_size = self.reliable.get_max_payload_size(self.get_payload_size(hostname, port))
+            if self.fragmenter is not None:
+                fragments = self.fragmenter.split(data, payload_size)
+            elif len(data) <= payload_size:
+                fragments = [data]
+            else:
+                raise ValueError("The data size is too large")
+            self.reliable.send(hostname, port, fragments, data)
+        elif self.fragmenter is not None:
+            self.writer.append_message(hostname, port, self.fragmenter.split(data, self.get_payload_size(hostname, port)),
+                                       data)
+            self.update_interest()
+        elif len(data) <= (self.MAX_MTU if self.mtu_cache is None else self.get_payload_size(hostname, port)):
+            # without a cache single datagrams keep the MAX_MTU limit and may be IP fragmented
+            self.writer.append(hostname, port, data)
+            self.update_interest()
         else:
             raise ValueError("The data size is too large")
 
@@ -159,18 +220,36 @@ class AsyncUDP(asyncore.dispatcher):
     def get_mtu_size(self):
         return self.MAX_MTU
 
+    # largest datagram payload to hostname that fits one IP packet: MAX_MTU, or the cached path MTU if smaller,
+    # without IP and UDP headers; fragments are cut to this so they never IP fragment and stay GSO eligible
+    def get_payload_size(self, hostname, port):
+        if self.mtu_cache is None:
+            return self.MAX_MTU - UDP_IP_OVERHEAD
+        return min(self.mtu_cache.get_mtu(hostname, port), self.MAX_MTU) - UDP_IP_OVERHEAD
+
     def check_mtu_size(self, hostname, port):
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect((hostname, port))
-        s.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
+        if self.mtu_cache is not None:
+            return self.mtu_cache.get_mtu(hostname, port)
+        return PmtuCache(default_mtu=self.MAX_MTU).probe(hostname, port)
+
+    def sendto(self, data, addr):
+        try:
+            return AsyncDispatcher.sendto(self, data, addr)
+        except socket.error as e:
+            self.check_emsgsize(e, addr)
+            raise
 
-        max_mtu = self.MAX_MTU
+    def sendto_segments(self, buffers, segment_size, addr):
         try:
-            s.send('#' * max_mtu)
-        except socket.error:
-            option = getattr(socket.IPPROTO_IP, 'IP_MTU', 14)
-            max_mtu = s.getsockopt(socket.IPPROTO_IP, option)
-        return max_mtu
+            return AsyncDispatcher.sendto_segments(self, buffers, segment_size, addr)
+        except socket.error as e:
+            self.check_emsgsize(e, addr)
+            raise
+
+    def check_emsgsize(self, e, addr):
+        # the path MTU shrank: look it up again on the next send to this host
+        if e.errno == errno.EMSGSIZE and self.mtu_cache is not None:
+            self.mtu_cache.invalidate(addr[0])
 
 # Echo udp server test
 # def readHandle(sock,addr, data):
@@ -0,0 +1,113 @@
+#!/usr/bin/python
+"""
+@file callback_dispatcher.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief CallbackDispatcher Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+CallbackDispatcher Class.
+
+Runs socket callbacks on a bounded thread pool instead of the reactor
+thread. Callbacks of one socket are queued and run one at a time, in order;
+different sockets run in parallel.
+"""
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DISPATCH_BATCH = 16
+
+'''
+Interfaces
+variables
+- max_pending # callbacks queued per socket before its reading is paused, None for unbounded
+functions
+- def dispatch(sock, func, *args) # queue func(*args) behind the socket's earlier callbacks
+- def get_pending(sock) # callbacks queued or running for the socket
+- def is_saturated(sock) # True while the socket has max_pending callbacks outstanding
+- def shutdown(wait=True)
+'''
+
+
+class CallbackDispatcher(object):
+    def __init__(self, max_workers=None, max_pending=None, executor=None):
+        self.lock = threading.RLock()
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.executor = executor
+        self.max_pending = max_pending
+        self.queue_map = {}  # sock -> deque of (func, args) not yet run
+        self.pending_map = {}  # sock -> callbacks queued or running
+
+    def dispatch(self, sock, func, *args):
+        with self.lock:
+            self.pending_map[sock] = self.pending_map.get(sock, 0) + 1
+            if sock in self.queue_map:
+                self.queue_map[sock].append((func, args))
+                return
+            self.queue_map[sock] = deque([(func, args)])
+        self.executor.submit(self.run, sock)
+
+    def get_pending(self, sock):
+        return self.pending_map.get(sock, 0)
+
+    def is_saturated(self, sock):
+        return self.max_pending is not None and self.pending_map.get(sock, 0) >= self.max_pending
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait)
+
+    def run(self, sock):
+        # one worker drains a socket's queue at a time, which keeps its callbacks in order;
+        # after a batch the socket goes to the back of the executor queue so busy sockets can't starve others
+        for _ in range(DISPATCH_BATCH):
+            with self.lock:
+                queue = self.queue_map[sock]
+                if len(queue) == 0:
+                    del self.queue_map[sock]
+                    return
+                func, args = queue.popleft()
+            try:
+                func(*args)
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+            with self.lock:
+                was_saturated = self.is_saturated(sock)
+                pending = self.pending_map[sock] - 1
+                if pending == 0:
+                    del self.pending_map[sock]
+                else:
+                    self.pending_map[sock] = pending
+            if was_saturated and not self.is_saturated(sock):
+                sock.update_interest()
+        self.executor.submit(self.run, sock)
@@ -49,6 +49,12 @@ class IUdpCallback(object):
     def on_received(self, server, addr, data):
         pass
 
+    # batch_receive mode: batch is [(addr, memoryview), ...], the views are only valid during this call
+    def on_received_batch(self, server, batch):
+        for addr, view in batch:
+            self.on_received(server, addr, view.tobytes())
+
+    # with reliable UDP status is SUCCESS once the peer acknowledged data, FAIL_TIMEOUT when it gave up
     def on_sent(self, server, status, data):
         pass
 
@@ -75,6 +81,22 @@ class ITcpSocketCallback(object):
     def on_sent(self, sock, status, data):
         pass
 
+    # piece of a frame body at or above stream_threshold; the frame is complete when is_last is True
+    def on_chunk(self, sock, frame_id, chunk, is_last):
+        pass
+
+    # the send queue dropped below the low watermark after reaching the high watermark
+    def on_drain(self, sock):
+        pass
+
+    # RPC request from the peer; answer it with sock.respond(request_id, data)
+    def on_request(self, sock, request_id, data):
+        pass
+
+    # AsyncTcpSocket only: no traffic for the server's idle_timeout seconds
+    def on_idle(self, sock):
+        pass
+
 
 class ITcpServerCallback(object):
     def on_started(self, server):
@@ -0,0 +1,168 @@
+#!/usr/bin/python
+"""
+@file datagram_fragmenter.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief DatagramFragmenter Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+DatagramFragmenter Class.
+
+Splits messages larger than a datagram into fragments behind a 9 byte
+header (marker, message id, fragment index, fragment count) and reassembles
+them on the receiving side. Partial messages are kept in a table keyed by
+(addr, message id) that is bounded in bytes and drops entries older than
+reassembly_timeout.
+"""
+import threading
+import time
+from collections import OrderedDict
+from struct import Struct
+
+FRAGMENT_MARKER = 0xFA
+FRAGMENT_STRUCT = Struct('!B I H H')  # marker, message id, index, count
+MAX_FRAGMENT_COUNT = 0xFFFF
+MESSAGE_ID_MASK = 0xFFFFFFFF
+
+'''
+Interfaces
+variables
+- reassembly_timeout # seconds a partial message is kept
+- max_reassembly_bytes # bytes held by partial messages at most, the oldest are dropped beyond it
+functions
+- def split(data, datagram_size) # returns the fragments of data, each at most datagram_size bytes
+- def get_max_message_size(datagram_size)
+- def reassemble(addr, fragment) # returns the whole message once its last fragment arrives, else None
+- def reassemble_batch(batch) # [(addr, fragment), ...] -> [(addr, memoryview of message), ...] for completed messages
+- def get_stats() # {'pending': partial messages, 'expired': timed out, 'evicted': dropped for memory, 'malformed': bad fragments}
+'''
+
+
+class DatagramFragmenter(object):
+    def __init__(self, reassembly_timeout=5.0, max_reassembly_bytes=4 * 1024 * 1024):
+        self.reassembly_timeout = reassembly_timeout
+        self.max_reassembly_bytes = max_reassembly_bytes
+        self.lock = threading.RLock()
+        self.next_id = 0
+        self.pending_map = OrderedDict()  # (addr, message id) -> entry, oldest first
+        self.pending_bytes = 0
+        self.expired_count = 0
+        self.evicted_count = 0
+        self.malformed_count = 0
+
+    def get_max_message_size(self, datagram_size):
+        return (datagram_size - FRAGMENT_STRUCT.size) * MAX_FRAGMENT_COUNT
+
+    def split(self, data, datagram_size):
+        payload_size = datagram_size - FRAGMENT_STRUCT.size
+        count = max((len(data) + payload_size - 1) // payload_size, 1)
+        if count > MAX_FRAGMENT_COUNT:
+            raise ValueError("The data size is too large")
+        with self.lock:
+            self.next_id = (self.next_id + 1) & MESSAGE_ID_MASK
+            message_id = self.next_id
+        # one buffer for all fragments, handed out as views
+        out = bytearray(len(data) + count * FRAGMENT_STRUCT.size)
+        view = memoryview(out)
+        fragments = []
+        pos = 0
+        for idx in range(count):
+            chunk = data[idx * payload_size:(idx + 1) * payload_size]
+            FRAGMENT_STRUCT.pack_into(out, pos, FRAGMENT_MARKER, message_id, idx, count)
+            end = pos + FRAGMENT_STRUCT.size + len(chunk)
+            out[pos + FRAGMENT_STRUCT.size:end] = chunk
+            fragments.append(view[pos:end])
+            pos = end
+        return fragments
+
+    def reassemble(self, addr, fragment):
+        if len(fragment) < FRAGMENT_STRUCT.size:
+            self.malformed_count += 1
+            return None
+        marker, message_id, idx, count = FRAGMENT_STRUCT.unpack_from(fragment)
+        if marker != FRAGMENT_MARKER or count == 0 or idx >= count:
+            self.malformed_count += 1
+            return None
+        payload = fragment[FRAGMENT_STRUCT.size:]
+        if count == 1:
+            return bytes(payload)
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            key = (addr, message_id)
+            entry = self.pending_map.get(key)
+            if entry is None:
+                if len(payload) * count > self.max_reassembly_bytes:
+                    self.malformed_count += 1
+                    return None
+                entry = {'parts': [None] * count, 'remaining': count, 'size': 0, 'deadline': now + self.reassembly_timeout}
+                self.pending_map[key] = entry
+            elif len(entry['parts']) != count:
+                self.malformed_count += 1
+                return None
+            if entry['parts'][idx] is not None:
+                # duplicate
+                return None
+            entry['parts'][idx] = bytes(payload)
+            entry['remaining'] -= 1
+            entry['size'] += len(payload)
+            self.pending_bytes += len(payload)
+            if entry['remaining'] == 0:
+                del self.pending_map[key]
+                self.pending_bytes -= entry['size']
+                return b''.join(entry['parts'])
+            while self.pending_bytes > self.max_reassembly_bytes:
+                _, evicted = self.pending_map.popitem(last=False)
+                self.pending_bytes -= evicted['size']
+                self.evicted_count += 1
+        return None
+
+    def reassemble_batch(self, batch):
+        messages = []
+        for addr, fragment in batch:
+            message = self.reassemble(addr, fragment)
+            if message is not None:
+                messages.append((addr, memoryview(message)))
+        return messages
+
+    def get_stats(self):
+        return {'pending': len(self.pending_map), 'expired': self.expired_count,
+                'evicted': self.evicted_count, 'malformed': self.malformed_count}
+
+    def _expire(self, now):
+        # entries are in arrival order, so the expired ones are at the front
+        while len(self.pending_map) != 0:
+            key, entry = next(iter(self.pending_map.items()))
+            if entry['deadline'] > now:
+                break
+            del self.pending_map[key]
+            self.pending_bytes -= entry['size']
+            self.expired_count += 1
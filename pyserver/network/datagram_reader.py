@@ -0,0 +1,70 @@
+#!/usr/bin/python
+"""
+@file datagram_reader.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief DatagramReader Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+DatagramReader Class.
+
+Drains a datagram socket into a fixed set of preallocated slots with
+recvfrom_into, up to read_budget datagrams per readiness event, instead of
+allocating a new bytes object for each recvfrom.
+"""
+
+'''
+Interfaces
+variables
+- slot_size # bytes per slot, longer datagrams are truncated like recvfrom(slot_size)
+- read_budget # datagrams read per readiness event at most, so one busy socket can't starve the others
+functions
+- def read(dispatcher) # returns [(addr, memoryview), ...], the views are reused on the next read
+'''
+
+
+class DatagramReader(object):
+    def __init__(self, slot_size=1500, read_budget=64):
+        self.slot_size = slot_size
+        self.read_budget = read_budget
+        self.buffer = bytearray(slot_size * read_budget)
+        self.view = memoryview(self.buffer)
+
+    def read(self, dispatcher):
+        batch = []
+        for idx in range(self.read_budget):
+            slot = self.view[idx * self.slot_size:(idx + 1) * self.slot_size]
+            received, addr = dispatcher.recvfrom_into(slot)
+            if addr is None:
+                # EAGAIN: the socket is drained
+                break
+            batch.append((addr, slot[:received]))
+        return batch
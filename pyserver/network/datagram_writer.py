@@ -0,0 +1,162 @@
+#!/usr/bin/python
+"""
+@file datagram_writer.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief DatagramWriter Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+DatagramWriter Class.
+
+Drains up to write_budget queued datagrams per writable event. Consecutive
+datagrams to the same destination go out with one sendmsg through UDP GSO
+where the kernel supports it, otherwise with a tight sendto loop.
+"""
+import errno
+import socket
+import traceback
+from collections import deque
+
+from .server_conf import *
+from .async_dispatcher import HAS_UDP_GSO
+
+MAX_GSO_SEGMENTS = 64  # kernel limit on segments per call
+MAX_GSO_SIZE = 65507  # largest IPv4 UDP payload
+# errors meaning the socket or device can't segment, after which GSO is turned off
+GSO_UNSUPPORTED = frozenset((errno.EIO, errno.EINVAL, errno.ENOPROTOOPT, errno.EOPNOTSUPP))
+
+'''
+Interfaces
+variables
+- send_queue # deque of send objects {'hostname': hostname, 'port': port, 'data': data}
+- write_budget # datagrams sent per writable event at most
+- gso # True while UDP GSO is used for runs of same-destination datagrams
+functions
+- def append(hostname, port, data)
+- def append_message(hostname, port, fragments, data) # queue the fragments of data, reported once all are sent
+- def is_writable()
+- def write(dispatcher) # send up to write_budget datagrams, returns [(send object, State), ...]
+#                          for fragmented messages the message {'hostname', 'port', 'data'} is returned after its last fragment
+'''
+
+
+class DatagramWriter(object):
+    def __init__(self, write_budget=256, use_gso=True):
+        self.send_queue = deque()  # thread-safe dequeue
+        self.write_budget = write_budget
+        self.gso = use_gso and HAS_UDP_GSO
+
+    def append(self, hostname, port, data):
+        self.send_queue.append({'hostname': hostname, 'port': port, 'data': data})
+
+    def append_message(self, hostname, port, fragments, data):
+        message = {'hostname': hostname, 'port': port, 'data': data, 'state': State.SUCCESS,
+                   'remaining': len(fragments)}
+        for fragment in fragments:
+            self.send_queue.append({'hostname': hostname, 'port': port, 'data': fragment, 'message': message})
+
+    def is_writable(self):
+        return len(self.send_queue) != 0
+
+    def write(self, dispatcher):
+        # only the reactor thread pops, so the head can be peeked at and popped once sent
+        completed = []
+        budget = self.write_budget
+        while len(self.send_queue) != 0 and budget > 0:
+            group = self._next_group(budget)
+            budget -= len(group)
+            if len(group) > 1 and self.gso:
+                send_obj = group[0]
+                try:
+                    dispatcher.sendto_segments([memoryview(obj['data']) for obj in group], len(send_obj['data']),
+                                               (send_obj['hostname'], send_obj['port']))
+                    self._pop(group, State.SUCCESS, completed)
+                    continue
+                except socket.error as e:
+                    if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                        break
+                    if e.errno not in GSO_UNSUPPORTED:
+                        print(e)
+                        traceback.print_exc()
+                        self._pop(group, State.FAIL_SOCKET_ERROR, completed)
+                        continue
+                    self.gso = False
+            if not self._write_each(dispatcher, group, completed):
+                break
+        return completed
+
+    def _write_each(self, dispatcher, group, completed):
+        for send_obj in group:
+            state = State.SUCCESS
+            try:
+                sent = dispatcher.sendto(send_obj['data'], (send_obj['hostname'], send_obj['port']))
+                if sent < len(send_obj['data']):
+                    state = State.FAIL_SOCKET_ERROR
+            except socket.error as e:
+                if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                    return False
+                print(e)
+                traceback.print_exc()
+                state = State.FAIL_SOCKET_ERROR
+            self._pop([send_obj], state, completed)
+        return True
+
+    def _pop(self, group, state, completed):
+        for send_obj in group:
+            self.send_queue.popleft()
+            message = send_obj.get('message')
+            if message is None:
+                completed.append((send_obj, state))
+                continue
+            if state != State.SUCCESS:
+                message['state'] = state
+            message['remaining'] -= 1
+            if message['remaining'] == 0:
+                completed.append((message, message['state']))
+
+    def _next_group(self, limit):
+        # a run of datagrams to one destination, all of the first one's size except a shorter last one
+        group = []
+        total = 0
+        # peek by index over a length snapshot: other threads append while iterating would raise
+        for i in range(min(limit, MAX_GSO_SEGMENTS, len(self.send_queue))):
+            send_obj = self.send_queue[i]
+            size = len(send_obj['data'])
+            if len(group) != 0:
+                first = group[0]
+                if (send_obj['hostname'], send_obj['port']) != (first['hostname'], first['port']) \
+                        or size > len(first['data']) or total + size > MAX_GSO_SIZE:
+                    break
+            group.append(send_obj)
+            total += size
+            if size == 0 or size < len(group[0]['data']):
+                break
+        return group
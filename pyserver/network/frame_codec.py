@@ -0,0 +1,244 @@
+#!/usr/bin/python
+"""
+@file frame_codec.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief FrameCodec Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+FrameCodec Classes.
+
+A codec defines how TCP frames are laid out on the wire. FrameDecoder and
+FrameWriter only go through the codec, so a server or client can talk to
+peers that use a plain length prefix or newline-delimited text instead of
+the pyserver preamble. Fixed layouts are parsed with precompiled
+struct.Struct objects straight out of the receive buffer.
+"""
+from struct import Struct
+
+from .preamble import *
+
+'''
+Interfaces
+variables
+- max_header_size # longest header the codec can produce
+- trailer # bytes written after every payload (delimiter), b'' for length-prefixed codecs
+- has_frame_info # True if headers carry flags and a frame id (required by RPC)
+functions
+- def encode_header(size, flags=0, frame_id=0) # header bytes for a payload of size bytes
+- def decode_header(buffer, start, end) # None if more bytes are needed,
+                                        # (header_size, body_size, trailer_size, flags, frame_id) for a frame,
+                                        # or (skip, None, 0, 0, 0) to drop skip bytes of garbage
+- def decode_all(buffer, start, end, max_body=None) # batch path: ([(flags, frame_id, body_start, body_end), ...], new_start)
+                                                    # stops before the first frame it can't cut out whole
+'''
+
+
+class FrameCodec(object):
+    max_header_size = 0
+    trailer = b''
+    has_frame_info = False
+
+    def encode_header(self, size, flags=0, frame_id=0):
+        raise NotImplementedError("Should have implemented this")
+
+    def decode_header(self, buffer, start, end):
+        raise NotImplementedError("Should have implemented this")
+
+    def decode_all(self, buffer, start, end, max_body=None):
+        frames = []
+        decode_header = self.decode_header
+        while True:
+            frame = decode_header(buffer, start, end)
+            if frame is None:
+                break
+            header_size, body_size, trailer_size, flags, frame_id = frame
+            if body_size is None or (max_body is not None and body_size >= max_body):
+                break
+            body_start = start + header_size
+            body_end = body_start + body_size
+            if body_end + trailer_size > end:
+                break
+            frames.append((flags, frame_id, body_start, body_end))
+            start = body_end + trailer_size
+        return frames, start
+
+    def check_frame_info(self, flags, frame_id):
+        if (flags or frame_id) and not self.has_frame_info:
+            raise ValueError('%s does not carry flags or frame ids' % self.__class__.__name__)
+
+
+# 16-byte pyserver preamble: magic, length and a reserved word holding flags and frame id
+class PreambleCodec(FrameCodec):
+    max_header_size = SIZE_PACKET_LENGTH
+    has_frame_info = True
+
+    def encode_header(self, size, flags=0, frame_id=0):
+        return PREAMBLE_STRUCT.pack(preambleCode, size, (flags << FLAG_SHIFT) | (frame_id & FRAME_ID_MASK))
+
+    def decode_header(self, buffer, start, end):
+        if end - start < SIZE_PACKET_LENGTH:
+            return None
+        preamble, size, reserved = PREAMBLE_STRUCT.unpack_from(buffer, start)
+        if preamble != preambleCode:
+            # jump straight to the next preamble code in everything buffered, keeping a code cut off at the end
+            idx = buffer.find(PREAMBLE_CODE, start + 1, end)
+            if idx < 0:
+                idx = max(end - len(PREAMBLE_CODE) + 1, start + 1)
+            return idx - start, None, 0, 0, 0
+        return SIZE_PACKET_LENGTH, size, 0, reserved >> FLAG_SHIFT, reserved & FRAME_ID_MASK
+
+    def decode_all(self, buffer, start, end, max_body=None):
+        frames = []
+        unpack_from = PREAMBLE_STRUCT.unpack_from
+        if max_body is None:
+            max_body = MAX_FRAME_SIZE + 1
+        while end - start >= SIZE_PACKET_LENGTH:
+            preamble, size, reserved = unpack_from(buffer, start)
+            body_start = start + SIZE_PACKET_LENGTH
+            if preamble != preambleCode or size >= max_body or body_start + size > end:
+                break
+            start = body_start + size
+            frames.append((reserved >> FLAG_SHIFT, reserved & FRAME_ID_MASK, body_start, start))
+        return frames, start
+
+
+# big-endian unsigned length prefix of 1, 2 or 4 bytes, as used by most length-prefixed protocols
+class LengthPrefixCodec(FrameCodec):
+    FORMATS = {1: '>B', 2: '>H', 4: '>I'}
+
+    def __init__(self, length_size=4, max_frame_size=MAX_FRAME_SIZE):
+        if length_size not in self.FORMATS:
+            raise ValueError('length_size must be 1, 2 or 4')
+        self.header_struct = Struct(self.FORMATS[length_size])
+        self.max_header_size = length_size
+        self.max_frame_size = min(max_frame_size, (1 << (8 * length_size)) - 1)
+
+    def encode_header(self, size, flags=0, frame_id=0):
+        self.check_frame_info(flags, frame_id)
+        if size > self.max_frame_size:
+            raise ValueError('frame of %d bytes exceeds max_frame_size' % size)
+        return self.header_struct.pack(size)
+
+    def decode_header(self, buffer, start, end):
+        if end - start < self.max_header_size:
+            return None
+        size = self.header_struct.unpack_from(buffer, start)[0]
+        if size > self.max_frame_size:
+            # a length prefix has no marker to resync on: drop what has been received
+            return end - start, None, 0, 0, 0
+        return self.max_header_size, size, 0, 0, 0
+
+    def decode_all(self, buffer, start, end, max_body=None):
+        frames = []
+        unpack_from = self.header_struct.unpack_from
+        header_size = self.max_header_size
+        limit = self.max_frame_size
+        if max_body is not None:
+            limit = min(limit, max_body - 1)
+        while end - start >= header_size:
+            size = unpack_from(buffer, start)[0]
+            body_start = start + header_size
+            if size > limit or body_start + size > end:
+                break
+            start = body_start + size
+            frames.append((0, 0, body_start, start))
+        return frames, start
+
+
+# unsigned LEB128 varint length prefix (protobuf style), one byte for payloads under 128 bytes
+class VarintCodec(FrameCodec):
+    max_header_size = 5
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+
+    def encode_header(self, size, flags=0, frame_id=0):
+        self.check_frame_info(flags, frame_id)
+        if size > self.max_frame_size:
+            raise ValueError('frame of %d bytes exceeds max_frame_size' % size)
+        header = bytearray()
+        while size >= 0x80:
+            header.append((size & 0x7F) | 0x80)
+            size >>= 7
+        header.append(size)
+        return bytes(header)
+
+    def decode_header(self, buffer, start, end):
+        size = 0
+        shift = 0
+        pos = start
+        while pos < end:
+            byte = buffer[pos]
+            pos += 1
+            size |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                if size > self.max_frame_size:
+                    return end - start, None, 0, 0, 0
+                return pos - start, size, 0, 0, 0
+            shift += 7
+            if shift >= 7 * self.max_header_size:
+                return end - start, None, 0, 0, 0
+        return None
+
+
+# payloads terminated by a delimiter; payloads must not contain the delimiter
+class NewlineCodec(FrameCodec):
+    def __init__(self, delimiter=b'\n', max_line_size=1048576):
+        self.trailer = delimiter
+        self.max_line_size = max_line_size
+
+    def encode_header(self, size, flags=0, frame_id=0):
+        self.check_frame_info(flags, frame_id)
+        return b''
+
+    def decode_header(self, buffer, start, end):
+        idx = buffer.find(self.trailer, start, end)
+        if idx < 0:
+            if end - start > self.max_line_size:
+                return end - start, None, 0, 0, 0
+            return None
+        return 0, idx - start, len(self.trailer), 0, 0
+
+    def decode_all(self, buffer, start, end, max_body=None):
+        frames = []
+        delimiter = self.trailer
+        delimiter_size = len(delimiter)
+        find = buffer.find
+        while True:
+            idx = find(delimiter, start, end)
+            if idx < 0 or (max_body is not None and idx - start >= max_body):
+                break
+            frames.append((0, 0, start, idx))
+            start = idx + delimiter_size
+        return frames, start
+
+
+DEFAULT_CODEC = PreambleCodec()
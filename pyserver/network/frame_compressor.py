@@ -0,0 +1,143 @@
+#!/usr/bin/python
+"""
+@file frame_compressor.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief FrameCompressor Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+FrameCompressor Class.
+
+zlib compression of single frames. Compressed frames are marked with
+FLAG_COMPRESSED in the frame header, so peers without a compressor still
+send and receive plain frames. A preset dictionary of typical payload
+content makes small, repetitive records compress well.
+"""
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from .preamble import *
+from .callback_dispatcher import CallbackDispatcher
+
+DEFAULT_COMPRESS_THRESHOLD = 1024
+DEFAULT_MAX_DECOMPRESSED_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_PENDING = 64
+
+'''
+Interfaces
+variables
+- threshold # payloads shorter than this are sent as they are
+- level # zlib compression level 0-9
+- zdict # optional preset dictionary, must be the same on both peers
+- max_decompressed_size # larger decompressed frames are rejected
+- max_pending # frames queued for decompression per socket before its reading is paused
+functions
+- def should_compress(data)
+- def compress_frame(data, flags) # returns (payload, flags), FLAG_COMPRESSED set only if it saved bytes
+- def decompress(data) # raises ValueError on corrupt or oversized frames
+- def submit(func, *args) # run func on the compression pool, off the reactor thread
+- def get_dispatcher() # CallbackDispatcher on the compression pool, for connections without one of their own
+- def get_pending(sock) # frames of the socket queued or running on get_dispatcher()
+- def shutdown(wait=True)
+'''
+
+
+class FrameCompressor(object):
+    def __init__(self, threshold=DEFAULT_COMPRESS_THRESHOLD, level=6, zdict=None,
+                 max_decompressed_size=DEFAULT_MAX_DECOMPRESSED_SIZE, max_workers=None, executor=None,
+                 max_pending=DEFAULT_MAX_PENDING):
+        self.threshold = threshold
+        self.level = level
+        self.zdict = zdict
+        self.max_decompressed_size = max_decompressed_size
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.lock = threading.RLock()
+        self.executor = executor
+        self.dispatcher = None
+
+    def should_compress(self, data):
+        return self.threshold is not None and len(data) >= self.threshold
+
+    def compress_frame(self, data, flags=0):
+        if self.zdict is not None:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, zlib.MAX_WBITS, zdict=self.zdict)
+        else:
+            compressor = zlib.compressobj(self.level)
+        payload = compressor.compress(data) + compressor.flush()
+        if len(payload) >= len(data):
+            return data, flags
+        return payload, flags | FLAG_COMPRESSED
+
+    def decompress(self, data):
+        if self.zdict is not None:
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict=self.zdict)
+        else:
+            decompressor = zlib.decompressobj()
+        try:
+            payload = decompressor.decompress(data, self.max_decompressed_size)
+        except zlib.error as e:
+            raise ValueError('corrupt compressed frame: %s' % e)
+        if len(decompressor.unconsumed_tail) != 0:
+            raise ValueError('compressed frame exceeds %d bytes' % self.max_decompressed_size)
+        if not decompressor.eof:
+            raise ValueError('truncated compressed frame')
+        return payload
+
+    # zlib releases the GIL on large buffers, so the pool compresses in parallel with the reactor
+    def submit(self, func, *args):
+        return self.get_executor().submit(func, *args)
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self.executor
+
+    # keeps a socket's decompressed frames, and the callbacks behind them, in order
+    def get_dispatcher(self):
+        with self.lock:
+            if self.dispatcher is None:
+                self.dispatcher = CallbackDispatcher(max_pending=self.max_pending, executor=self.get_executor())
+            return self.dispatcher
+
+    def get_pending(self, sock):
+        if self.dispatcher is None:
+            return 0
+        return self.dispatcher.get_pending(sock)
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait)
+
+
+# decompresses frames from compressing peers on connections without a compressor of their own
+DEFAULT_DECOMPRESSOR = FrameCompressor(threshold=None)
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+"""
+@file frame_decoder.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief FrameDecoder Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+FrameDecoder Class.
+
+Reads into one reusable bytearray with recv_into and cuts every complete
+frame out of it with the connection's FrameCodec, so a burst of small frames costs one syscall and
+each payload is copied exactly once, out of the buffer.
+"""
+from .preamble import *
+from .frame_codec import DEFAULT_CODEC
+
+DEFAULT_BUFFER_SIZE = 65536
+DEFAULT_READ_BUDGET = 1048576
+
+'''
+Interfaces
+variables
+- codec # FrameCodec defining the wire layout, PreambleCodec by default
+- buffer_size
+- buffer_pool # BufferPool lending the buffers for large frames
+- pooled # yield payloads as PooledBuffer objects from buffer_pool instead of bytes
+- read_budget # max bytes read per read() call so one busy peer can't starve the reactor
+- frame_flags, frame_id # header fields of the frame read() just yielded
+- stream_threshold # bodies of at least this many bytes are yielded in chunks as they arrive, None to disable
+- streaming, is_last # True when read() just yielded a chunk of a streamed body / its last chunk
+functions
+- def read(dispatcher) # generator yielding the payload of every complete frame
+- def pending() # number of buffered bytes not yet decoded
+- def get_corruption_stats() # {'corruption_events': garbage runs skipped, 'discarded_bytes': bytes dropped}
+'''
+
+
+class FrameDecoder(object):
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, read_budget=DEFAULT_READ_BUDGET, stream_threshold=None,
+                 codec=None, buffer_pool=None, pooled=False):
+        if codec is None:
+            codec = DEFAULT_CODEC
+        self.codec = codec
+        self.buffer_size = buffer_size
+        self.read_budget = read_budget
+        self.stream_threshold = stream_threshold
+        self.buffer_pool = buffer_pool
+        self.pooled = pooled and buffer_pool is not None
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.body_size = None  # body size of the frame in progress, None while waiting for a header
+        self.trailer_size = 0
+        self.corruption_count = 0  # runs of garbage skipped while looking for a header
+        self.discarded_bytes = 0
+        self.in_garbage = False
+        self.frame_flags = 0
+        self.frame_id = 0
+        self.streaming = False
+        self.is_last = False
+
+    def pending(self):
+        return self.end - self.start
+
+    def get_corruption_stats(self):
+        return {'corruption_events': self.corruption_count, 'discarded_bytes': self.discarded_bytes}
+
+    def read(self, dispatcher):
+        total = 0
+        while dispatcher.connected and total < self.read_budget:
+            self._reserve()
+            space = len(self.buffer) - self.end
+            received = dispatcher.recv_into(self.view[self.end:])
+            if not received:
+                return
+            self.end += received
+            total += received
+            for payload in self._decode():
+                yield payload
+            if received < space:
+                # short read: the kernel has nothing more for now
+                return
+
+    def _decode(self):
+        codec = self.codec
+        while True:
+            if self.body_size is None:
+                # batch path: cut out every complete frame below the stream threshold in one call
+                frames, batch_end = codec.decode_all(self.buffer, self.start, self.end, self.stream_threshold)
+                self.streaming = False
+                if len(frames) != 0:
+                    self.in_garbage = False
+                trailer_size = len(codec.trailer)
+                for self.frame_flags, self.frame_id, body_start, body_end in frames:
+                    # consume one frame at a time, so a consumer that stops early leaves the rest buffered
+                    self.start = body_end + trailer_size
+                    yield self._payload(body_start, body_end)
+                self.start = batch_end
+                frame = codec.decode_header(self.buffer, self.start, self.end)
+                if frame is None:
+                    break
+                header_size, body_size, trailer_size, flags, frame_id = frame
+                self.start += header_size
+                if body_size is None:
+                    # garbage in front of the next header; one run counts as one corruption event
+                    if not self.in_garbage:
+                        self.in_garbage = True
+                        self.corruption_count += 1
+                    self.discarded_bytes += header_size
+                    continue
+                self.in_garbage = False
+                self.frame_flags, self.frame_id = flags, frame_id
+                self.body_size = body_size
+                self.trailer_size = trailer_size
+                # RPC, compressed and delimited frames are always delivered whole
+                self.streaming = self.stream_threshold is not None and body_size >= self.stream_threshold and \
+                    trailer_size == 0 and not flags & (FLAG_RPC_REQUEST | FLAG_RPC_RESPONSE | FLAG_COMPRESSED)
+            available = self.end - self.start
+            if self.streaming:
+                if available == 0 and self.body_size != 0:
+                    break
+                size = min(available, self.body_size)
+                chunk = bytes(self.view[self.start:self.start + size])
+                self.start += size
+                self.body_size -= size
+                self.is_last = self.body_size == 0
+                if self.is_last:
+                    self.body_size = None
+                yield chunk
+                continue
+            if available < self.body_size + self.trailer_size:
+                break
+            payload = self._payload(self.start, self.start + self.body_size)
+            self.start += self.body_size + self.trailer_size
+            self.body_size = None
+            yield payload
+        if self.start == self.end:
+            self.start = self.end = 0
+
+    def _reserve(self):
+        # make room at the tail: rewind when empty, compact the partial frame, or grow for a large frame
+        available = self.end - self.start
+        if available == 0:
+            self.start = self.end = 0
+            if len(self.buffer) > self.buffer_size:
+                self._resize(self.buffer_size)
+            return
+        if self.body_size is None or self.streaming:
+            # a delimiter may still be ahead, so grow geometrically while waiting for a header
+            needed = max(self.codec.max_header_size, available + 1)
+            if needed > len(self.buffer):
+                needed = max(needed, len(self.buffer) * 2)
+        else:
+            needed = self.body_size + self.trailer_size
+        if needed > len(self.buffer):
+            self._resize(needed)
+        elif len(self.buffer) - self.end < needed - available or self.end == len(self.buffer):
+            self.buffer[:available] = self.buffer[self.start:self.end]
+            self.start = 0
+            self.end = available
+
+    # copy a payload out of the receive buffer, into a pooled buffer when pooled is set
+    def _payload(self, start, end):
+        if not self.pooled:
+            return bytes(self.view[start:end])
+        size = end - start
+        buf = self.buffer_pool.acquire(size)
+        buf[:size] = self.view[start:end]
+        return self.buffer_pool.wrap(buf, size)
+
+    def _resize(self, size):
+        available = self.end - self.start
+        if self.buffer_pool is not None and size > self.buffer_size:
+            buf = self.buffer_pool.acquire(size)
+        else:
+            buf = bytearray(size)
+        buf[:available] = self.view[self.start:self.end]
+        self.view.release()
+        if self.buffer_pool is not None and len(self.buffer) > self.buffer_size:
+            # grown buffers go back to the pool when a large frame is done
+            self.buffer_pool.release(self.buffer)
+        self.buffer = buf
+        self.view = memoryview(buf)
+        self.start = 0
+        self.end = available
@@ -0,0 +1,331 @@
+#!/usr/bin/python
+"""
+@file frame_writer.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief FrameWriter Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+FrameWriter Class.
+
+Keeps the header and payload of each queued frame as separate buffers and
+drains as many frames as the socket accepts with one sendmsg (writev) call.
+File bodies are sent straight from the file with sendfile.
+"""
+import os
+import threading
+import traceback
+from collections import deque
+
+from .preamble import *
+from .server_conf import *
+from .frame_codec import DEFAULT_CODEC
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+
+class SendQueueFull(Exception):
+    pass
+
+
+'''
+Interfaces
+variables
+- send_queue # deque of send objects {'data': data, 'header': header, 'payload': body, 'buffers': [memoryview, ...]}
+#              payload is what goes on the wire (e.g. compressed data), data is what on_sent reports
+#              file frames also carry 'file', 'offset' and 'count' (file bytes still to send)
+#              reserved frames carry 'pending' until fill() provides their header and payload
+#              frames queued with a tag carry it as 'tag', e.g. the request id of an RPC call
+- queued_bytes # framed bytes waiting to be sent
+- high_watermark # queued_bytes at which the writer becomes full, None for unbounded
+- low_watermark # queued_bytes below which a full writer drains and on_drain is called
+- codec # FrameCodec framing appended data, PreambleCodec by default
+functions
+- def append(data, policy, can_block, header=None, payload=None, tag=None) # frame data (or use the given header) and queue it, returns State
+- def reserve(data, policy, can_block, tag=None) # hold a place in the queue, returns (State, send object)
+- def fill(send_obj, header, payload) # complete a reserved frame; frames behind it wait until then
+- def is_writable() # True if the head of the queue is ready to be sent
+- def append_file(file, size, header, data, policy, can_block) # queue a frame whose body is sent from file
+- def write(dispatcher) # send as much as possible, returns the list of completed send objects
+- def fail_all() # drop every queued send object and return them
+- def rewind() # restore a partially sent head frame so it is sent whole on a new connection
+- def trim(max_count) # keep the oldest max_count send objects, return the dropped ones
+- def get_tags() # set of the tags of the queued send objects
+- def drop_tagged(keep) # drop tagged send objects for which keep(tag) is False, return them
+- def is_full()
+- def close() # release blocked senders and refuse further data
+'''
+
+
+class FrameWriter(object):
+    def __init__(self, high_watermark=None, low_watermark=None, on_drain=None, codec=None):
+        if codec is None:
+            codec = DEFAULT_CODEC
+        self.codec = codec
+        self.send_queue = deque()  # thread-safe dequeue
+        self.cond = threading.Condition()
+        self.queued_bytes = 0
+        self.high_watermark = high_watermark
+        if low_watermark is None and high_watermark is not None:
+            low_watermark = high_watermark // 2
+        self.low_watermark = low_watermark
+        self.on_drain = on_drain
+        self.full = False
+        self.closed = False
+
+    def is_full(self):
+        return self.full
+
+    def append(self, data, policy=OverflowPolicy.RETURN, can_block=True, header=None, payload=None, tag=None):
+        if payload is None:
+            payload = data
+        if header is None:
+            header = self.codec.encode_header(len(payload))
+        buffers = self._frame_buffers(header, payload)
+        send_obj = {'data': data, 'header': header, 'payload': payload, 'buffers': buffers}
+        if tag is not None:
+            send_obj['tag'] = tag
+        return self._enqueue(send_obj, len(header) + len(payload) + len(self.codec.trailer), policy, can_block)
+
+    def reserve(self, data, policy=OverflowPolicy.RETURN, can_block=True, tag=None):
+        # counted at its unencoded size until filled
+        size = self.codec.max_header_size + len(data) + len(self.codec.trailer)
+        send_obj = {'data': data, 'header': b'', 'payload': b'', 'buffers': [], 'pending': True, 'size': size}
+        if tag is not None:
+            send_obj['tag'] = tag
+        return self._enqueue(send_obj, size, policy, can_block), send_obj
+
+    def fill(self, send_obj, header, payload):
+        with self.cond:
+            if not send_obj.get('pending') or send_obj.get('dropped'):
+                return
+            send_obj['header'] = header
+            send_obj['payload'] = payload
+            send_obj['buffers'] = self._frame_buffers(header, payload)
+            send_obj['pending'] = False
+            size = sum(len(buf) for buf in send_obj['buffers'])
+            if size > send_obj['size']:
+                self.queued_bytes += size - send_obj['size']
+                if self.high_watermark is not None and self.queued_bytes >= self.high_watermark:
+                    self.full = True
+        if size < send_obj['size']:
+            self._consumed(send_obj['size'] - size)
+
+    def is_writable(self):
+        try:
+            return len(self.send_queue) != 0 and not self.send_queue[0].get('pending')
+        except IndexError:
+            return False
+
+    def _frame_buffers(self, header, data):
+        buffers = []
+        if len(header) != 0:
+            buffers.append(memoryview(header))
+        if len(data) != 0:
+            buffers.append(memoryview(data))
+        if len(self.codec.trailer) != 0:
+            buffers.append(memoryview(self.codec.trailer))
+        return buffers
+
+    def append_file(self, file, size, header, data=None, policy=OverflowPolicy.RETURN, can_block=True):
+        send_obj = {'data': data, 'header': header, 'buffers': [memoryview(header)],
+                    'file': file, 'offset': 0, 'count': size}
+        return self._enqueue(send_obj, len(header) + size, policy, can_block)
+
+    def _enqueue(self, send_obj, size, policy, can_block):
+        with self.cond:
+            while self.full and not self.closed:
+                if policy == OverflowPolicy.BLOCK and can_block:
+                    self.cond.wait()
+                elif policy == OverflowPolicy.RAISE:
+                    raise SendQueueFull('%d bytes queued' % self.queued_bytes)
+                else:
+                    return State.FAIL_QUEUE_FULL
+            if self.closed:
+                return State.FAIL_SOCKET_ERROR
+            self.queued_bytes += size
+            if self.high_watermark is not None and self.queued_bytes >= self.high_watermark:
+                self.full = True
+            self.send_queue.append(send_obj)
+        return State.SUCCESS
+
+    def write(self, dispatcher):
+        # only the reactor thread pops, so frames taken here can be put back in order with appendleft
+        if len(self.send_queue) != 0 and len(self.send_queue[0]['buffers']) == 0 and 'file' in self.send_queue[0]:
+            return self._write_file(dispatcher)
+        in_flight = []
+        buffers = []
+        while len(self.send_queue) != 0 and len(buffers) < IOV_MAX - 1:
+            if self.send_queue[0].get('pending'):
+                # keep the order: nothing behind a reserved frame goes out before it
+                break
+            send_obj = self.send_queue.popleft()
+            in_flight.append(send_obj)
+            buffers.extend(send_obj['buffers'])
+            if 'file' in send_obj:
+                # the file body has to follow its header before anything queued behind it
+                break
+        if len(buffers) == 0:
+            return in_flight
+        try:
+            sent = dispatcher.sendmsg(buffers)
+        except Exception:
+            for send_obj in reversed(in_flight):
+                self.send_queue.appendleft(send_obj)
+            raise
+        self._consumed(sent)
+
+        completed = []
+        for idx, send_obj in enumerate(in_flight):
+            obj_buffers = send_obj['buffers']
+            while len(obj_buffers) != 0 and sent >= len(obj_buffers[0]):
+                sent -= len(obj_buffers.pop(0))
+            if len(obj_buffers) != 0 or send_obj.get('count', 0) != 0:
+                if sent != 0:
+                    obj_buffers[0] = obj_buffers[0][sent:]
+                for remain_obj in reversed(in_flight[idx:]):
+                    self.send_queue.appendleft(remain_obj)
+                break
+            self._release(send_obj)
+            completed.append(send_obj)
+        return completed
+
+    def _write_file(self, dispatcher):
+        send_obj = self.send_queue[0]
+        sent = dispatcher.sendfile(send_obj['file'], send_obj['offset'], send_obj['count'])
+        send_obj['offset'] += sent
+        send_obj['count'] -= sent
+        self._consumed(sent)
+        if send_obj['count'] != 0:
+            return []
+        self.send_queue.popleft()
+        self._release(send_obj)
+        return [send_obj]
+
+    def fail_all(self):
+        failed = []
+        failed_bytes = 0
+        while len(self.send_queue) != 0:
+            send_obj = self.send_queue.popleft()
+            failed_bytes += self._remaining(send_obj)
+            self._release(send_obj)
+            failed.append(send_obj)
+        self._consumed(failed_bytes)
+        return failed
+
+    def rewind(self):
+        with self.cond:
+            if len(self.send_queue) == 0:
+                return
+            send_obj = self.send_queue[0]
+            if send_obj.get('pending'):
+                return
+            remaining = self._remaining(send_obj)
+            if 'file' in send_obj:
+                send_obj['buffers'] = [memoryview(send_obj['header'])]
+                send_obj['count'] += send_obj['offset']
+                send_obj['offset'] = 0
+                size = len(send_obj['header']) + send_obj['count']
+            else:
+                send_obj['buffers'] = self._frame_buffers(send_obj['header'], send_obj['payload'])
+                size = sum(len(buf) for buf in send_obj['buffers'])
+            self.queued_bytes += size - remaining
+
+    def trim(self, max_count):
+        dropped = []
+        dropped_bytes = 0
+        while len(self.send_queue) > max_count:
+            send_obj = self.send_queue.pop()
+            dropped_bytes += self._remaining(send_obj)
+            self._release(send_obj)
+            dropped.append(send_obj)
+        dropped.reverse()
+        self._consumed(dropped_bytes)
+        return dropped
+
+    def get_tags(self):
+        # appends happen under cond, so the queue can be walked while holding it
+        with self.cond:
+            return set(send_obj['tag'] for send_obj in self.send_queue if 'tag' in send_obj)
+
+    def drop_tagged(self, keep):
+        dropped = []
+        with self.cond:
+            kept = []
+            for send_obj in self.send_queue:
+                if 'tag' in send_obj and not keep(send_obj['tag']):
+                    dropped.append(send_obj)
+                else:
+                    kept.append(send_obj)
+            if len(dropped) != 0:
+                self.send_queue.clear()
+                self.send_queue.extend(kept)
+        dropped_bytes = 0
+        for send_obj in dropped:
+            dropped_bytes += self._remaining(send_obj)
+            self._release(send_obj)
+        self._consumed(dropped_bytes)
+        return dropped
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _remaining(self, send_obj):
+        if send_obj.get('pending'):
+            return send_obj['size']
+        return sum(len(buf) for buf in send_obj['buffers']) + send_obj.get('count', 0)
+
+    def _release(self, send_obj):
+        with self.cond:
+            # a reserved frame dropped here must not be filled later
+            send_obj['dropped'] = True
+        if 'file' in send_obj:
+            try:
+                send_obj['file'].close()
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
+
+    def _consumed(self, size):
+        drained = False
+        with self.cond:
+            self.queued_bytes -= size
+            if self.full and self.queued_bytes <= self.low_watermark:
+                self.full = False
+                drained = True
+                self.cond.notify_all()
+        if drained and self.on_drain is not None:
+            self.on_drain()
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+"""
+@file pmtu_cache.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief PmtuCache Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+PmtuCache Class.
+
+Path MTU per destination host, read from the kernel's route cache through
+IP_MTU on a connected probe socket with IP_MTU_DISCOVER set to DO. Entries
+expire after ttl seconds and are dropped on EMSGSIZE, so the next lookup
+reads the path MTU the kernel learned from ICMP. Entries are keyed by IP
+address through a ResolverCache with the same ttl, so a hostname and its
+address share one entry and lookups don't hit the resolver on every send.
+One cache can be shared by every socket of the process.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from .resolver_cache import ResolverCache
+
+IP_MTU_DISCOVER = getattr(socket, 'IP_MTU_DISCOVER', 10)
+IP_PMTUDISC_DO = getattr(socket, 'IP_PMTUDISC_DO', 2)  # Always DF.
+IP_MTU = getattr(socket, 'IP_MTU', 14)
+UDP_IP_OVERHEAD = 28  # IPv4 header without options + UDP header
+
+'''
+Interfaces
+variables
+- ttl # seconds a path MTU stays cached
+- default_mtu # used where the platform can't report the path MTU
+functions
+- def get_mtu(hostname, port=9) # cached path MTU, probed when missing or expired
+- def get_payload_size(hostname, port=9) # largest UDP payload that fits the path MTU
+- def probe(hostname, port=9) # read the path MTU now, bypassing the cache
+- def invalidate(hostname) # drop the entry, e.g. after EMSGSIZE; never blocks on the resolver
+- def resolve(hostname) # the IP address entries for hostname are kept under, cached for ttl
+'''
+
+
+class PmtuCache(object):
+    def __init__(self, ttl=600.0, default_mtu=1500, max_entries=4096):
+        self.ttl = ttl
+        self.default_mtu = default_mtu
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.mtu_map = OrderedDict()  # ip -> (mtu, expiry), oldest first
+        self.resolver = ResolverCache(ttl, max_entries)
+
+    def get_mtu(self, hostname, port=9):
+        now = time.monotonic()
+        ip = self.resolve(hostname)
+        with self.lock:
+            entry = self.mtu_map.get(ip)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        mtu = self.probe(ip, port)
+        with self.lock:
+            self.mtu_map.pop(ip, None)
+            self.mtu_map[ip] = (mtu, now + self.ttl)
+            while len(self.mtu_map) > self.max_entries:
+                self.mtu_map.popitem(last=False)
+        return mtu
+
+    def get_payload_size(self, hostname, port=9):
+        return self.get_mtu(hostname, port) - UDP_IP_OVERHEAD
+
+    def probe(self, hostname, port=9):
+        # connecting a UDP socket sends nothing, it only looks up the route
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_DO)
+            s.connect((hostname, port))
+            return s.getsockopt(socket.IPPROTO_IP, IP_MTU)
+        except (socket.error, OSError):
+            return self.default_mtu
+        finally:
+            s.close()
+
+    # called on the reactor thread after EMSGSIZE, so only an already resolved hostname is looked up
+    def invalidate(self, hostname):
+        ip = self.resolver.get_cached(hostname)
+        if ip is None:
+            ip = hostname
+        with self.lock:
+            self.mtu_map.pop(ip, None)
+
+    # the cache key for hostname; an address resolves to itself without a lookup
+    def resolve(self, hostname):
+        try:
+            return self.resolver.resolve(hostname)
+        except (socket.error, OSError):
+            return hostname
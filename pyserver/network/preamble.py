@@ -38,38 +38,47 @@ Preamble Class.
 from struct import *
 
 SIZE_PACKET_LENGTH = 16
+PREAMBLE_STRUCT = Struct('= Q I I')
 preambleCode = 0x00F0F0F0F0F0F0F8
+MAX_FRAME_SIZE = 0xFFFFFFFF
+PREAMBLE_CODE = Struct('= Q').pack(preambleCode)
+
+# the reserved word carries 8 flag bits above a 24-bit frame id (e.g. RPC correlation id)
+FLAG_SHIFT = 24
+FRAME_ID_MASK = 0x00FFFFFF
+FLAG_RPC_REQUEST = 0x01
+FLAG_RPC_RESPONSE = 0x02
+FLAG_COMPRESSED = 0x04
 
 
 class Preamble(object):
     @staticmethod
-    def to_preamble_packet(should_receive):
+    def to_preamble_packet(should_receive, flags=0, frame_id=0):
         if should_receive < 0:
             return None
-        byte_arr = pack('= Q', preambleCode)
-        byte_arr += pack('= I', should_receive)
-        byte_arr += pack('= I', 0)
-        return byte_arr
+        return PREAMBLE_STRUCT.pack(preambleCode, should_receive, (flags << FLAG_SHIFT) | (frame_id & FRAME_ID_MASK))
 
     @staticmethod
     def to_should_receive(preamble_packet):
-        preamble, should_receive, dummy = unpack('= Q I I', preamble_packet)
+        preamble, should_receive, dummy = PREAMBLE_STRUCT.unpack(preamble_packet)
         if preamble != preambleCode or should_receive < 0:
             return -1
         return should_receive
 
+    # returns (flags, frame_id) from the reserved word
+    @staticmethod
+    def to_frame_info(preamble_packet):
+        preamble, should_receive, reserved = PREAMBLE_STRUCT.unpack(preamble_packet)
+        return reserved >> FLAG_SHIFT, reserved & FRAME_ID_MASK
+
+    # offset of the first (possibly cut off) preamble code in the packet, len(packet) if there is none
     @staticmethod
     def check_preamble(preamble_packet):
-        correct_preamble = pack('= Q', preambleCode)
-        prev_trav = 0
-        for prev_trav in range(len(preamble_packet)):
-            contains = True
-            for idx in range(len(correct_preamble)):
-                if idx + prev_trav >= len(preamble_packet):
-                    break
-                if correct_preamble[idx] != preamble_packet[prev_trav + idx]:
-                    contains = False
-                    break
-            if contains:
-                break
-        return prev_trav
+        packet = bytes(preamble_packet)
+        idx = packet.find(PREAMBLE_CODE)
+        if idx >= 0:
+            return idx
+        for idx in range(max(len(packet) - len(PREAMBLE_CODE) + 1, 0), len(packet)):
+            if PREAMBLE_CODE.startswith(packet[idx:]):
+                return idx
+        return len(packet)
@@ -0,0 +1,385 @@
+#!/usr/bin/python
+"""
+@file reliable_datagram.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief ReliableDatagram Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+ReliableDatagram Class.
+
+Opt-in reliable delivery over AsyncUDP. Every datagram gets a per-peer
+sequence number. Receivers answer with a cumulative ack plus a selective
+ack bitmap for the 32 sequences after it. Senders keep a congestion window
+(slow start, then additive increase, halved on loss), retransmit on an
+RTO estimated from the smoothed RTT (RFC 6298), and resend early once a
+packet has been skipped by three selective acks. Delivery is in order by
+default, or as soon as each datagram arrives with ordered=False.
+"""
+import random
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from struct import Struct
+
+from .server_conf import *
+from .resolver_cache import ResolverCache
+
+RELIABLE_MARKER = 0xFB
+TYPE_DATA = 1
+TYPE_ACK = 2
+DATA_STRUCT = Struct('!B B I I')  # marker, type, sequence, lowest sequence the sender still tracks
+ACK_STRUCT = Struct('!B B I I')  # marker, type, next expected sequence, bitmap of the 32 sequences after it
+SEQ_MASK = 0xFFFFFFFF
+SACK_BITS = 32
+FAST_RETRANSMIT_THRESHOLD = 3
+
+'''
+Interfaces
+variables
+- ordered # deliver in sequence order, False to deliver each datagram as soon as it arrives
+- max_retries # retransmissions before a message is reported with State.FAIL_TIMEOUT
+- max_window # congestion window limit in datagrams
+- receive_window # sequences ahead of the next expected one a receiver accepts
+- min_rto / max_rto # retransmit timeout bounds in seconds
+- max_peers # peers tracked at most, the least recently active one is dropped and its messages fail with FAIL_QUEUE_FULL
+- peer_timeout # seconds a peer with nothing in flight is kept after its last packet
+- resolver # ResolverCache mapping send() hostnames to the peer's IP without a lookup per message
+functions
+- def get_max_payload_size(datagram_size)
+- def send(hostname, port, fragments, data) # queue the fragments of data, on_sent reports it once all are acknowledged
+- def receive_batch(batch) # [(addr, datagram), ...] -> [(addr, payload), ...] ready for delivery, acks are queued
+- def get_stats(addr) # {'srtt', 'rto', 'cwnd', 'in_flight', 'waiting'} for a peer
+- def fail_all(state) # stop retransmitting, report every outstanding message and forget all peers
+'''
+
+
+def _unwrap(wire, base):
+    # the 32-bit sequence on the wire nearest to base
+    diff = (wire - base) & SEQ_MASK
+    if diff > SEQ_MASK // 2:
+        diff -= SEQ_MASK + 1
+    return base + diff
+
+
+class ReliablePeer(object):
+    def __init__(self, initial_window, initial_rto):
+        # sender side
+        self.next_seq = random.getrandbits(32)
+        self.unacked = OrderedDict()  # seq -> packet entry, oldest first
+        self.waiting = deque()  # entries held back by the congestion window
+        self.cwnd = float(initial_window)
+        self.ssthresh = float('inf')
+        self.srtt = None
+        self.rttvar = 0.0
+        self.rto = initial_rto
+        self.loss_time = 0.0  # when the window was last reduced, later losses of packets sent before it are the same event
+        self.last_activity = time.monotonic()
+        # receiver side
+        self.expected = None
+        self.received = {}  # seq -> payload (None when unordered) for sequences past expected
+
+
+class ReliableDatagram(object):
+    def __init__(self, sock, ordered=True, max_retries=10, initial_window=4, max_window=256, receive_window=1024,
+                 initial_rto=0.5, min_rto=0.05, max_rto=10.0, max_peers=4096, peer_timeout=60.0):
+        self.sock = sock
+        self.ordered = ordered
+        self.max_retries = max_retries
+        self.initial_window = initial_window
+        self.max_window = max_window
+        self.receive_window = receive_window
+        self.initial_rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.max_peers = max_peers
+        self.peer_timeout = peer_timeout
+        self.lock = threading.RLock()
+        self.peer_map = OrderedDict()  # (ip, port) -> ReliablePeer, least recently active first
+        self.resolver = ResolverCache()
+        self.malformed_count = 0
+        self.evicted_count = 0
+
+    def get_max_payload_size(self, datagram_size):
+        return datagram_size - DATA_STRUCT.size
+
+    def get_stats(self, addr):
+        peer = self.peer_map.get(addr)
+        if peer is None:
+            return None
+        return {'srtt': peer.srtt, 'rto': peer.rto, 'cwnd': peer.cwnd, 'in_flight': len(peer.unacked),
+                'waiting': len(peer.waiting)}
+
+    def send(self, hostname, port, fragments, data):
+        addr = (self.resolver.resolve(hostname), port)
+        message = {'data': data, 'remaining': len(fragments), 'done': False}
+        reports = []
+        with self.lock:
+            peer = self._peer(addr, reports)
+            for fragment in fragments:
+                peer.waiting.append({'payload': fragment, 'message': message})
+            self._pump(addr, peer)
+        self.sock.update_interest()
+        self._report(reports)
+
+    def receive_batch(self, batch):
+        delivered = []
+        reports = []
+        with self.lock:
+            for addr, datagram in batch:
+                self._receive(addr, datagram, delivered, reports)
+        self.sock.update_interest()
+        self._report(reports)
+        return delivered
+
+    def expire(self, addr, seq):
+        reports = []
+        with self.lock:
+            peer = self.peer_map.get(addr)
+            entry = peer.unacked.get(seq) if peer is not None else None
+            if entry is None:
+                return
+            entry['timer'] = None
+            if entry['retries'] >= self.max_retries:
+                del peer.unacked[seq]
+                self._complete(entry['message'], State.FAIL_TIMEOUT, reports)
+            else:
+                entry['retries'] += 1
+                if entry['sent_time'] >= peer.loss_time:
+                    peer.ssthresh = max(peer.cwnd / 2, 2.0)
+                    peer.cwnd = 1.0
+                    peer.rto = min(peer.rto * 2, self.max_rto)
+                    peer.loss_time = time.monotonic()
+                self._transmit(addr, peer, entry)
+            self._pump(addr, peer)
+        self.sock.update_interest()
+        self._report(reports)
+
+    def fail_all(self, state=State.FAIL_SOCKET_ERROR):
+        reports = []
+        with self.lock:
+            for peer in self.peer_map.values():
+                for entry in list(peer.unacked.values()) + list(peer.waiting):
+                    if entry.get('timer') is not None:
+                        entry['timer'].cancel()
+                    self._complete(entry['message'], state, reports)
+                peer.unacked.clear()
+                peer.waiting.clear()
+            self.peer_map.clear()
+        self._report(reports)
+
+    def _peer(self, addr, reports):
+        peer = self.peer_map.get(addr)
+        if peer is not None:
+            self._touch(addr, peer)
+            return peer
+        self._expire(time.monotonic(), reports)
+        peer = ReliablePeer(self.initial_window, self.initial_rto)
+        self.peer_map[addr] = peer
+        return peer
+
+    def _touch(self, addr, peer):
+        peer.last_activity = time.monotonic()
+        self.peer_map.move_to_end(addr)
+
+    def _expire(self, now, reports):
+        # peers are in activity order, so the idle ones are at the front
+        while len(self.peer_map) != 0:
+            addr, peer = next(iter(self.peer_map.items()))
+            if len(self.peer_map) < self.max_peers:
+                if len(peer.unacked) != 0 or len(peer.waiting) != 0 or now - peer.last_activity < self.peer_timeout:
+                    break
+            else:
+                # the table is full: drop the least recently active peer even with messages outstanding
+                for entry in list(peer.unacked.values()) + list(peer.waiting):
+                    if entry.get('timer') is not None:
+                        entry['timer'].cancel()
+                    self._complete(entry['message'], State.FAIL_QUEUE_FULL, reports)
+                self.evicted_count += 1
+            del self.peer_map[addr]
+
+    def _pump(self, addr, peer):
+        while len(peer.waiting) != 0 and len(peer.unacked) < int(peer.cwnd):
+            entry = peer.waiting.popleft()
+            if entry['message']['done']:
+                # another fragment of the message already failed
+                continue
+            seq = peer.next_seq
+            peer.next_seq += 1
+            base = next(iter(peer.unacked)) if len(peer.unacked) != 0 else seq
+            entry['seq'] = seq
+            entry['packet'] = DATA_STRUCT.pack(RELIABLE_MARKER, TYPE_DATA, seq & SEQ_MASK, base & SEQ_MASK) + \
+                bytes(entry['payload'])
+            entry['retries'] = 0
+            entry['skipped'] = 0
+            entry['timer'] = None
+            peer.unacked[seq] = entry
+            self._transmit(addr, peer, entry)
+
+    def _transmit(self, addr, peer, entry):
+        entry['sent_time'] = time.monotonic()
+        self.sock.writer.append(addr[0], addr[1], entry['packet'])
+        if entry['timer'] is not None:
+            entry['timer'].cancel()
+        if self.sock.reactor is not None:
+            entry['timer'] = self.sock.reactor.call_later(peer.rto, self.expire, addr, entry['seq'])
+
+    def _receive(self, addr, datagram, delivered, reports):
+        if len(datagram) < DATA_STRUCT.size:
+            self.malformed_count += 1
+            return
+        marker, packet_type, wire_seq, wire_value = DATA_STRUCT.unpack_from(datagram)
+        if marker != RELIABLE_MARKER:
+            self.malformed_count += 1
+        elif packet_type == TYPE_DATA:
+            self._receive_data(addr, wire_seq, wire_value, datagram[DATA_STRUCT.size:], delivered, reports)
+        elif packet_type == TYPE_ACK:
+            peer = self.peer_map.get(addr)
+            if peer is not None:
+                self._touch(addr, peer)
+                self._receive_ack(addr, peer, wire_seq, wire_value, reports)
+        else:
+            self.malformed_count += 1
+
+    def _receive_data(self, addr, wire_seq, wire_base, payload, delivered, reports):
+        peer = self._peer(addr, reports)
+        if peer.expected is None:
+            peer.expected = wire_base
+        base = _unwrap(wire_base, peer.expected)
+        if abs(base - peer.expected) > self.receive_window:
+            # the sender restarted with a new sequence space
+            peer.expected = base
+            peer.received = {}
+        seq = _unwrap(wire_seq, peer.expected)
+        if seq < base or seq >= base + self.receive_window:
+            self.malformed_count += 1
+            return
+        if base > peer.expected:
+            # the sender gave up on everything below base
+            self._advance(addr, peer, base, delivered)
+        if peer.expected <= seq < peer.expected + self.receive_window and seq not in peer.received:
+            if self.ordered:
+                peer.received[seq] = bytes(payload)
+            else:
+                peer.received[seq] = None
+                delivered.append((addr, bytes(payload)))
+            self._advance(addr, peer, peer.expected, delivered)
+        # every data packet is acked, duplicates too; same sized acks to a peer leave in one GSO send
+        self.sock.writer.append(addr[0], addr[1], ACK_STRUCT.pack(RELIABLE_MARKER, TYPE_ACK, peer.expected & SEQ_MASK,
+                                                                 self._sack(peer)))
+
+    def _advance(self, addr, peer, upto, delivered):
+        while peer.expected < upto or peer.expected in peer.received:
+            if peer.expected in peer.received:
+                payload = peer.received.pop(peer.expected)
+                if self.ordered:
+                    delivered.append((addr, payload))
+            peer.expected += 1
+
+    def _sack(self, peer):
+        bits = 0
+        for idx in range(SACK_BITS):
+            if peer.expected + 1 + idx in peer.received:
+                bits |= 1 << idx
+        return bits
+
+    def _receive_ack(self, addr, peer, wire_expected, sack_bits, reports):
+        base = next(iter(peer.unacked)) if len(peer.unacked) != 0 else peer.next_seq
+        expected = _unwrap(wire_expected, base)
+        acked = []
+        for seq in peer.unacked:
+            if seq >= expected:
+                break
+            acked.append(seq)
+        highest = expected - 1
+        for idx in range(SACK_BITS):
+            if sack_bits >> idx & 1:
+                highest = expected + 1 + idx
+                if highest in peer.unacked:
+                    acked.append(highest)
+        now = time.monotonic()
+        for seq in acked:
+            entry = peer.unacked.pop(seq)
+            if entry['timer'] is not None:
+                entry['timer'].cancel()
+            if entry['retries'] == 0:
+                # Karn: only sample packets that were sent once
+                self._sample_rtt(peer, now - entry['sent_time'])
+            if peer.cwnd < peer.ssthresh:
+                peer.cwnd += 1
+            else:
+                peer.cwnd += 1.0 / peer.cwnd
+            peer.cwnd = min(peer.cwnd, float(self.max_window))
+            self._complete(entry['message'], State.SUCCESS, reports)
+        # packets older than a selectively acked one were probably lost
+        for seq, entry in peer.unacked.items():
+            if seq >= highest:
+                break
+            entry['skipped'] += 1
+            if entry['skipped'] == FAST_RETRANSMIT_THRESHOLD:
+                if entry['sent_time'] >= peer.loss_time:
+                    peer.ssthresh = max(peer.cwnd / 2, 2.0)
+                    peer.cwnd = peer.ssthresh
+                    peer.loss_time = now
+                entry['retries'] += 1
+                self._transmit(addr, peer, entry)
+        self._pump(addr, peer)
+
+    def _sample_rtt(self, peer, rtt):
+        if peer.srtt is None:
+            peer.srtt = rtt
+            peer.rttvar = rtt / 2
+        else:
+            peer.rttvar = 0.75 * peer.rttvar + 0.25 * abs(peer.srtt - rtt)
+            peer.srtt = 0.875 * peer.srtt + 0.125 * rtt
+        peer.rto = min(max(peer.srtt + 4 * peer.rttvar, self.min_rto), self.max_rto)
+
+    def _complete(self, message, state, reports):
+        if message['done']:
+            return
+        if state == State.SUCCESS:
+            message['remaining'] -= 1
+            if message['remaining'] != 0:
+                return
+        message['done'] = True
+        reports.append((state, message['data']))
+
+    def _report(self, reports):
+        callback = self.sock.callback
+        if callback is None:
+            return
+        for state, data in reports:
+            try:
+                callback.on_sent(self.sock, state, data)
+            except Exception as e:
+                print(e)
+                traceback.print_exc()
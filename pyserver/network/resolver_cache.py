@@ -0,0 +1,101 @@
+#!/usr/bin/python
+"""
+@file resolver_cache.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief ResolverCache Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+
+ResolverCache Class.
+
+Hostname to IPv4 address lookups cached for ttl seconds, so per-datagram
+sends to a hostname do not each block on the system resolver. Address
+literals are returned as they are without a lookup.
+"""
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+'''
+Interfaces
+variables
+- ttl # seconds a resolved address stays cached
+functions
+- def resolve(hostname) # cached IPv4 address of hostname, raises socket.gaierror if it can't be resolved
+- def get_cached(hostname) # the cached address without resolving, None if there is none
+- def invalidate(hostname)
+'''
+
+
+def _is_address(hostname):
+    try:
+        socket.inet_pton(socket.AF_INET, hostname)
+        return True
+    except (socket.error, OSError, TypeError):
+        return False
+
+
+class ResolverCache(object):
+    def __init__(self, ttl=600.0, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.address_map = OrderedDict()  # hostname -> (ip, expiry), oldest first
+
+    def resolve(self, hostname):
+        if _is_address(hostname):
+            return hostname
+        now = time.monotonic()
+        with self.lock:
+            entry = self.address_map.get(hostname)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        ip = socket.gethostbyname(hostname)
+        with self.lock:
+            self.address_map.pop(hostname, None)
+            self.address_map[hostname] = (ip, now + self.ttl)
+            while len(self.address_map) > self.max_entries:
+                self.address_map.popitem(last=False)
+        return ip
+
+    def get_cached(self, hostname):
+        if _is_address(hostname):
+            return hostname
+        with self.lock:
+            entry = self.address_map.get(hostname)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def invalidate(self, hostname):
+        with self.lock:
+            self.address_map.pop(hostname, None)
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+"""
+@file rpc_channel.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief RpcChannel Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+RpcChannel Class.
+
+Request/response matching over one TCP connection. Requests carry a 24-bit
+correlation id in the frame header (the preamble's reserved word), so any
+number of calls can be in flight and responses may come back in any order.
+The connection's codec has to carry frame ids, which PreambleCodec does.
+"""
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from .preamble import *
+from .server_conf import *
+from .frame_writer import SendQueueFull
+
+'''
+Interfaces
+functions
+- def call(data, timeout=None) # returns concurrent.futures.Future resolved with the response payload
+- def respond(request_id, data) # answer a request received through on_request
+- def handle_response(request_id, data)
+- def fail_all(exception, keep=()) # fail every outstanding call except the request ids in keep, e.g. on disconnect
+- def get_pending_count()
+- def is_pending(request_id) # True while the call has neither completed nor failed
+'''
+
+
+class RpcChannel(object):
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.RLock()
+        self.next_id = 0
+        self.pending_map = {}  # request id -> (future, timeout timer)
+
+    def call(self, data, timeout=None):
+        future = Future()
+        with self.lock:
+            if len(self.pending_map) > FRAME_ID_MASK:
+                raise SendQueueFull('too many outstanding calls')
+            while True:
+                self.next_id = self.next_id % FRAME_ID_MASK + 1
+                if self.next_id not in self.pending_map:
+                    break
+            request_id = self.next_id
+            timer = None
+            if timeout is not None and self.sock.reactor is not None:
+                timer = self.sock.reactor.call_later(timeout, self.expire, request_id)
+            self.pending_map[request_id] = (future, timer)
+        try:
+            state = self.sock.send_data(data, FLAG_RPC_REQUEST, request_id)
+        except Exception:
+            self.fail(request_id, ConnectionError('request could not be sent'))
+            raise
+        if state != State.SUCCESS:
+            if state == State.FAIL_QUEUE_FULL:
+                self.fail(request_id, SendQueueFull('send queue is full'))
+            else:
+                self.fail(request_id, ConnectionError('connection is closed'))
+        return future
+
+    def respond(self, request_id, data):
+        return self.sock.send_data(data, FLAG_RPC_RESPONSE, request_id)
+
+    def handle_response(self, request_id, data):
+        with self.lock:
+            entry = self.pending_map.pop(request_id, None)
+        if entry is None:
+            # late response to a call that already timed out
+            return
+        future, timer = entry
+        if timer is not None:
+            timer.cancel()
+        if future.set_running_or_notify_cancel():
+            future.set_result(data)
+
+    def expire(self, request_id):
+        self.fail(request_id, TimeoutError('rpc call timed out'))
+
+    def fail(self, request_id, exception):
+        with self.lock:
+            entry = self.pending_map.pop(request_id, None)
+        if entry is None:
+            return
+        future, timer = entry
+        if timer is not None:
+            timer.cancel()
+        if future.set_running_or_notify_cancel():
+            future.set_exception(exception)
+
+    def fail_all(self, exception, keep=()):
+        with self.lock:
+            request_id_list = [request_id for request_id in self.pending_map if request_id not in keep]
+        for request_id in request_id_list:
+            self.fail(request_id, exception)
+
+    def get_pending_count(self):
+        return len(self.pending_map)
+
+    def is_pending(self, request_id):
+        return request_id in self.pending_map
@@ -37,5 +37,7 @@ Server Configurations Class.
 """
 from pyserver.util.enum import *
 
-State = Enum(['SUCCESS', 'FAIL_SOCKET_ERROR'])
+State = Enum(['SUCCESS', 'FAIL_SOCKET_ERROR', 'FAIL_QUEUE_FULL', 'FAIL_TIMEOUT'])
 PacketType = Enum(['SIZE', 'DATA'])
+ReactorPolicy = Enum(['LEAST_LOADED', 'HASH'])
+OverflowPolicy = Enum(['RETURN', 'RAISE', 'BLOCK'])
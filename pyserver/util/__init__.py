@@ -5,3 +5,5 @@ from .singleton import *
 from .subproc_controller import *
 from .timeout import *
 from .timer import *
+from .timing_wheel import *
+from .buffer_pool import *
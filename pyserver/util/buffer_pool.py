@@ -0,0 +1,136 @@
+#!/usr/bin/python
+"""
+@file buffer_pool.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief BufferPool Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+BufferPool Class.
+
+Keeps released bytearrays in power-of-two size classes so hot paths can
+reuse them instead of allocating and collecting a new buffer per frame.
+"""
+import threading
+
+DEFAULT_MIN_SIZE = 256
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_PER_CLASS = 64
+
+'''
+Interfaces
+variables
+- min_size # smallest size class, a power of two
+- max_size # largest size class; bigger requests are allocated and dropped as usual
+- max_per_class # free buffers kept per size class
+functions
+- def acquire(size) # bytearray of at least size bytes
+- def release(buffer) # hand a buffer from acquire() back
+- def wrap(buffer, size) # PooledBuffer over buffer[:size], released back into this pool
+- def get_stats() # hits / misses / released / dropped counters
+'''
+
+
+class PooledBuffer(object):
+    # memoryview over a (pooled) buffer; release() hands the buffer back for reuse
+    def __init__(self, pool, buffer, size):
+        self.pool = pool
+        self.buffer = buffer
+        self.view = memoryview(buffer)[:size]
+
+    def __len__(self):
+        return len(self.view)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def tobytes(self):
+        return self.view.tobytes()
+
+    def release(self):
+        if self.buffer is None:
+            return
+        self.view.release()
+        if self.pool is not None:
+            self.pool.release(self.buffer)
+        self.buffer = None
+
+
+class BufferPool(object):
+    def __init__(self, min_size=DEFAULT_MIN_SIZE, max_size=DEFAULT_MAX_SIZE, max_per_class=DEFAULT_MAX_PER_CLASS):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_per_class = max_per_class
+        self.lock = threading.Lock()
+        self.free_map = {}  # size class -> list of free bytearrays
+        self.hits = 0
+        self.misses = 0
+        self.released = 0
+        self.dropped = 0
+
+    def size_class(self, size):
+        if size > self.max_size:
+            return None
+        return max(self.min_size, 1 << max(size - 1, 0).bit_length())
+
+    def acquire(self, size):
+        class_size = self.size_class(size)
+        if class_size is None:
+            return bytearray(size)
+        with self.lock:
+            free_list = self.free_map.get(class_size)
+            if free_list:
+                self.hits += 1
+                return free_list.pop()
+            self.misses += 1
+        return bytearray(class_size)
+
+    def release(self, buffer):
+        size = len(buffer)
+        if size != self.size_class(size):
+            return
+        with self.lock:
+            free_list = self.free_map.setdefault(size, [])
+            if len(free_list) < self.max_per_class:
+                free_list.append(buffer)
+                self.released += 1
+            else:
+                self.dropped += 1
+
+    def wrap(self, buffer, size):
+        return PooledBuffer(self, buffer, size)
+
+    def get_stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'released': self.released, 'dropped': self.dropped,
+                    'free': sum(len(free_list) for free_list in self.free_map.values())}
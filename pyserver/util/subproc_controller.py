@@ -43,6 +43,7 @@ import traceback
 import copy
 import subprocess
 import os
+import time
 
 
 @Singleton
@@ -50,9 +51,13 @@ class SubProcController(object):
     def __init__(self):
         self.lock = threading.RLock()
         self.sub_proc_map = {}
+        self.restart_map = {}  # proc_name -> (arg, env) for processes restarted when they die
+        self.monitor_interval = 1.0
+        self.monitor_thread = None
 
     def kill_all(self):
         with self.lock:
+            self.restart_map = {}
             delete_set = copy.copy(self.sub_proc_map)
             for key in delete_set:
                 try:
@@ -63,27 +68,38 @@ class SubProcController(object):
                     traceback.print_exc()
             self.sub_proc_map = {}
 
-    def create_subprocess(self, proc_name, arg):
+    def create_subprocess(self, proc_name, arg, restart=False, env=None):
         proc = None
         with self.lock:
             if proc_name in self.sub_proc_map:
                 raise Exception('proc_name already exists!')
             try:
-                def preexec_function():
-                    os.setpgrp()
-
-                proc = subprocess.Popen(arg, preexec_fn=preexec_function)
+                proc = self._popen(arg, env)
                 self.sub_proc_map[proc_name] = proc
+                if restart:
+                    self.restart_map[proc_name] = (arg, env)
+                    self._start_monitor()
             except Exception as e:
                 print(e)
                 traceback.print_exc()
         return proc
 
+    # start count supervised workers named proc_name-0 .. proc_name-(count-1)
+    # each worker gets its index in the PYSERVER_WORKER_INDEX environment variable
+    def create_workers(self, proc_name, arg, count, restart=True):
+        proc_list = []
+        for idx in range(count):
+            env = dict(os.environ)
+            env['PYSERVER_WORKER_INDEX'] = str(idx)
+            proc_list.append(self.create_subprocess('%s-%d' % (proc_name, idx), arg, restart, env))
+        return proc_list
+
     def kill(self, proc_name):
         print('subProcController kill called')
         with self.lock:
             try:
                 if isinstance(proc_name, str):
+                    self.restart_map.pop(proc_name, None)
                     if proc_name in self.sub_proc_map:
                         self.sub_proc_map[proc_name].terminate()
                         del self.sub_proc_map[proc_name]
@@ -96,8 +112,43 @@ class SubProcController(object):
                             break
                     if delete_key is not None:
                         del self.sub_proc_map[delete_key]
+                        self.restart_map.pop(delete_key, None)
             except Exception as e:
                 print(e)
                 traceback.print_exc()
 
+    @staticmethod
+    def _popen(arg, env):
+        def preexec_function():
+            os.setpgrp()
+
+        return subprocess.Popen(arg, preexec_fn=preexec_function, env=env)
+
+    def _start_monitor(self):
+        with self.lock:
+            if self.monitor_thread is not None and self.monitor_thread.is_alive():
+                return
+            self.monitor_thread = threading.Thread(target=self._monitor)
+            self.monitor_thread.daemon = True
+            self.monitor_thread.start()
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.monitor_interval)
+            with self.lock:
+                if len(self.restart_map) == 0:
+                    self.monitor_thread = None
+                    return
+                for proc_name in list(self.restart_map):
+                    proc = self.sub_proc_map.get(proc_name)
+                    if proc is not None and proc.poll() is None:
+                        continue
+                    print(proc_name + ' died, restarting...')
+                    arg, env = self.restart_map[proc_name]
+                    try:
+                        self.sub_proc_map[proc_name] = self._popen(arg, env)
+                    except Exception as e:
+                        print(e)
+                        traceback.print_exc()
+
 # foo = SubProcController.instance()
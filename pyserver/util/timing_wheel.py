@@ -0,0 +1,186 @@
+#!/usr/bin/python
+"""
+@file timing_wheel.py
+@author Woong Gyu La a.k.a Chris. <juhgiyo@gmail.com>
+        <http://github.com/juhgiyo/pyserver>
+@date October 18, 2026
+@brief TimingWheel Interface
+@version 0.1
+
+@section LICENSE
+
+The MIT License (MIT)
+
+Copyright (c) 2016 Woong Gyu La <juhgiyo@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+@section DESCRIPTION
+
+Hashed TimingWheel Class.
+
+Timers are hashed into wheel_size slots of tick seconds each on the
+monotonic clock, so scheduling and cancelling are O(1) and advancing costs
+one slot per elapsed tick however many timers are pending. Periodic timers
+are re-armed from the time they were due, so wakeup latency does not add
+up over their periods.
+"""
+import math
+import threading
+import time
+
+'''
+Interfaces
+variables
+- tick # seconds per slot
+- wheel_size # number of slots
+functions
+- def schedule(delay, callback, args=(), interval=None) # returns TimerHandle
+- def cancel(handle)
+- def advance() # returns the list of expired handles, re-arming periodic ones
+- def next_timeout() # seconds until the next due tick or None when empty, tracked rather than scanned on every call
+- def __len__()
+'''
+
+
+class TimerHandle(object):
+    def __init__(self, wheel, callback, args, interval):
+        self.wheel = wheel
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.slot = None
+        self.rounds = 0
+        self.deadline = 0  # tick the handle is due on
+        self.due_time = 0.0  # seconds after the wheel's start the handle is due, kept exact for periodic re-arming
+        self.cancelled = False
+
+    def cancel(self):
+        self.wheel.cancel(self)
+
+    def run(self):
+        self.callback(*self.args)
+
+
+class TimingWheel(object):
+    def __init__(self, tick=0.01, wheel_size=1024):
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.slots = [set() for _ in range(wheel_size)]
+        self.lock = threading.RLock()
+        self.start_time = time.monotonic()
+        self.current_tick = 0
+        self.next_tick = None  # no timer is due before this tick; may be early after a cancel
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, delay, callback, args=(), interval=None):
+        handle = TimerHandle(self, callback, args, interval)
+        with self.lock:
+            self._insert(handle, delay)
+        return handle
+
+    def cancel(self, handle):
+        with self.lock:
+            handle.cancelled = True
+            if handle.slot is not None:
+                self.slots[handle.slot].discard(handle)
+                handle.slot = None
+                self.count -= 1
+
+    def advance(self):
+        expired = []
+        with self.lock:
+            target_tick = int((time.monotonic() - self.start_time) / self.tick)
+            elapsed = target_tick - self.current_tick
+            if elapsed <= 0:
+                return expired
+            if elapsed >= self.wheel_size:
+                # every slot is visited at least once: take the visit count per slot at once
+                for offset in range(1, self.wheel_size + 1):
+                    tick = self.current_tick + offset
+                    visits = (elapsed - offset) // self.wheel_size + 1
+                    self._expire_slot(tick % self.wheel_size, visits, expired)
+                expired.sort(key=lambda handle: handle.deadline)
+            else:
+                for tick in range(self.current_tick + 1, target_tick + 1):
+                    self._expire_slot(tick % self.wheel_size, 1, expired)
+            self.current_tick = target_tick
+            for handle in expired:
+                if handle.interval is not None:
+                    self._rearm(handle)
+        return expired
+
+    def next_timeout(self):
+        with self.lock:
+            if self.count == 0:
+                return None
+            if self.next_tick is None or self.next_tick <= self.current_tick:
+                self.next_tick = self._find_next_tick()
+            deadline = self.start_time + self.next_tick * self.tick
+        return max(deadline - time.monotonic(), 0)
+
+    def _find_next_tick(self):
+        # runs once the tracked tick has passed, not on every poll
+        for offset in range(1, self.wheel_size + 1):
+            tick = self.current_tick + offset
+            for handle in self.slots[tick % self.wheel_size]:
+                if handle.rounds == 0:
+                    return tick
+        return self.current_tick + self.wheel_size
+
+    def _expire_slot(self, slot, visits, expired):
+        for handle in list(self.slots[slot]):
+            if handle.rounds < visits:
+                self.slots[slot].discard(handle)
+                handle.slot = None
+                self.count -= 1
+                expired.append(handle)
+            else:
+                handle.rounds -= visits
+
+    def _insert(self, handle, delay):
+        if handle.cancelled:
+            return
+        handle.due_time = time.monotonic() + delay - self.start_time
+        self._place(handle, int(math.ceil(handle.due_time / self.tick)))
+
+    def _rearm(self, handle):
+        if handle.cancelled:
+            return
+        handle.due_time += handle.interval
+        deadline = int(math.ceil(handle.due_time / self.tick))
+        if deadline <= self.current_tick:
+            # skip the periods missed while the loop was blocked
+            missed = int((self.current_tick - deadline) * self.tick // handle.interval) + 1
+            handle.due_time += missed * handle.interval
+            deadline = int(math.ceil(handle.due_time / self.tick))
+        self._place(handle, deadline)
+
+    def _place(self, handle, deadline):
+        ticks = max(deadline - self.current_tick, 1)
+        handle.deadline = self.current_tick + ticks
+        handle.slot = handle.deadline % self.wheel_size
+        handle.rounds = (ticks - 1) // self.wheel_size
+        self.slots[handle.slot].add(handle)
+        self.count += 1
+        if self.next_tick is None or handle.deadline < self.next_tick:
+            self.next_tick = handle.deadline
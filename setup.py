@@ -16,13 +16,13 @@ setup(
   keywords = ['tcp', 'udp', 'server', 'library'], # arbitrary keywords
   license="The MIT License (MIT)",
   install_requires=['pyserialize'],
+  python_requires='>=3.5',
   classifiers = [
     # How mature is this project? Common values are
     #   3 - Alpha
     #   4 - Beta
     #   5 - Production/Stable
     'Development Status :: 5 - Production/Stable',
-    'Programming Language :: Python :: 2.7',
     'Programming Language :: Python :: 3',
   ],
 )